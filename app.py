@@ -1,21 +1,127 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+import re
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Annotated, List
+import orjson
+from pydantic import Field
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from bible_comfort_service import BibleComfortService, BibleComfortQuery, BibleComfortResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from openai import APITimeoutError, AuthenticationError, OpenAIError, RateLimitError
+from comfort_base import completed_items
+from comfort_cache import LLMCache, openai_embedder
+from openai_calls import init_openai_client
+from bible_comfort_service import (
+    COMFORT_MODEL,
+    MAX_BATCH_QUERIES,
+    BatchNotFoundError,
+    BibleComfortBatch,
+    BibleComfortQuery,
+    BibleComfortResponse,
+    BibleComfortService,
+)
+from combined_comfort_service import CombinedComfortResponse, CombinedComfortService
 from philosophy_comfort_service import (
     PhilosophyComfortService,
     PhilosophyComfortQuery,
     PhilosophyComfortResponse,
 )
-from tts_service import TTSRequest, TTSService
+from tts_service import TextTooLongError, TTSCache, TTSRequest, TTSService, load_phrases
+
+logger = logging.getLogger(__name__)
+
+# Checked once at startup instead of on every request.
+HAS_OPENAI_KEY = bool(os.environ.get("OPENAI_API_KEY"))
+if not HAS_OPENAI_KEY:
+    logger.warning("OPENAI_API_KEY is not set; comfort and TTS endpoints will return 500.")
+
+
+def _require_openai_key() -> None:
+    if not HAS_OPENAI_KEY:
+        raise HTTPException(status_code=500, detail="Server missing OPENAI_API_KEY")
+
+
+def _json_response(data, headers=None) -> Response:
+    # Service results were already validated when parsed from the model's JSON, so they
+    # are encoded directly instead of being re-validated against the response model.
+    return Response(content=orjson.dumps(data), media_type="application/json", headers=headers)
+
+
+def _cache_headers(hit: bool) -> dict:
+    return {"X-Cache": "HIT" if hit else "MISS"}
+
+
+def _build_cache(service) -> LLMCache:
+    # Semantic (embedding) matching costs one embeddings call per miss, so it is opt-in.
+    embedder = None
+    if os.environ.get("COMFORT_SEMANTIC_CACHE") == "1" and service.client is not None:
+        embedder = openai_embedder(service.client)
+    return LLMCache(
+        ttl=int(os.environ.get("COMFORT_CACHE_TTL", "3600")),
+        embedder=embedder,
+    )
+
+
+# One client (and httpx connection pool) shared by every service.
+openai_client = init_openai_client()
 
 # Instantiate services
-comfort_service = BibleComfortService()
-philosophy_service = PhilosophyComfortService()
-tts_service = TTSService()
+comfort_service = BibleComfortService(openai_client)
+comfort_service.cache = _build_cache(comfort_service)
+philosophy_service = PhilosophyComfortService(openai_client)
+philosophy_service.cache = _build_cache(philosophy_service)
+combined_service = CombinedComfortService(comfort_service, philosophy_service)
+# TTS is not routed through create_chat_completion, so keep the SDK's own retries;
+# with_options() copies the client but reuses its httpx pool.
+tts_service = TTSService(openai_client.with_options(max_retries=2) if openai_client else None)
+tts_cache = TTSCache(
+    os.environ.get("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts-cache")),
+    max_bytes=int(os.environ.get("TTS_CACHE_MAX_BYTES", str(100 * 1024 * 1024))),
+)
 
-app = FastAPI(title="Comfort API (OpenAI SDK)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the TLS (and HTTP/2) connection to OpenAI before the first user request needs it.
+    if HAS_OPENAI_KEY and openai_client is not None:
+        try:
+            await openai_client.models.retrieve(COMFORT_MODEL)
+        except Exception as e:
+            logger.warning("OpenAI connection warm-up failed: %s", e)
+    warm_task = None
+    phrases_path = os.environ.get("TTS_WARM_PHRASES")
+    if HAS_OPENAI_KEY and phrases_path:
+        # Runs in the background so startup does not wait on synthesis.
+        warm_task = asyncio.create_task(_warm_tts_cache(phrases_path))
+    yield
+    if warm_task is not None:
+        warm_task.cancel()
+    if openai_client is not None:
+        await openai_client.close()
+
+
+async def _warm_tts_cache(phrases_path: str) -> None:
+    try:
+        phrases = load_phrases(phrases_path)
+    except (OSError, ValueError) as e:
+        logger.warning("TTS cache warm-up skipped: %s", e)
+        return
+    # Every worker pins the phrases in its own TTSCache, but only one synthesizes them into
+    # the shared directory; a worker starting later finds them cached and pays nothing.
+    tts_service.pin_phrases(tts_cache, phrases)
+    with tts_cache.try_lock("warm") as acquired:
+        if not acquired:
+            return
+        results = await tts_service.warm_cache(tts_cache, phrases)
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if failures:
+        logger.warning("TTS cache warm-up: %d of %d phrases failed, first: %s", len(failures), len(results), failures[0])
+
+
+app = FastAPI(title="Comfort API (OpenAI SDK)", lifespan=lifespan)
 
 # Change to your GitHub Pages domain (user page and/or project page)
 ALLOWED_ORIGINS = [
@@ -29,72 +135,173 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Comfort responses are several KB of JSON; audio and SSE are excluded by default.
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
 
+# Checked in order; any other OpenAIError is reported as a bad gateway.
+_OPENAI_ERROR_STATUS = (
+    (RateLimitError, 429),
+    (APITimeoutError, 504),
+    (AuthenticationError, 401),
+)
+
+
+@app.exception_handler(OpenAIError)
+async def openai_error_handler(request: Request, exc: OpenAIError):
+    status_code = next((code for cls, code in _OPENAI_ERROR_STATUS if isinstance(exc, cls)), 502)
+    return JSONResponse(status_code=status_code, content={"detail": f"OpenAI request failed: {exc}"})
+
+
+@app.exception_handler(ValueError)
+@app.exception_handler(RuntimeError)
+async def service_error_handler(request: Request, exc: Exception):
+    # Services raise ValueError/RuntimeError for bad or missing LLM output.
+    return JSONResponse(status_code=502, content={"detail": str(exc)})
+
+
+@app.post("/bible-comfort", responses={200: {"model": BibleComfortResponse}})
+async def bible_comfort(q: BibleComfortQuery):
+    _require_openai_key()
+
+    result, hit = await comfort_service.get_comfort_with_cache_status(q)
+    return _json_response(result, headers=_cache_headers(hit))
 
-@app.post("/bible-comfort", response_model=BibleComfortResponse)
-def bible_comfort(q: BibleComfortQuery):
-    # Basic validation
-    if not os.environ.get("OPENAI_API_KEY"):
-        raise HTTPException(status_code=500, detail="Server missing OPENAI_API_KEY")
 
+async def _comfort_event_stream(service, q, progressive_key=None):
+    # Deltas are raw model output, JSON-encoded so embedded newlines cannot break SSE framing.
+    # The closing `event: result` carries the normalized response the non-stream endpoint returns.
+    streamed = ""
+    sent = 0
     try:
-        # Inline the previous wrapper body by delegating directly to the service
-        result = comfort_service.get_comfort(q)
-        return result
-    except (ValueError, RuntimeError) as e:
-        raise HTTPException(status_code=502, detail=str(e))
+        async for delta in service.stream_comfort(q):
+            yield f"data: {orjson.dumps(delta).decode()}\n\n"
+            streamed += delta
+            if progressive_key:
+                # Emit each list item (e.g. a passage) as soon as it is complete so clients can render it early.
+                items = service.finalize_stream_items(progressive_key, completed_items(streamed, progressive_key), q)
+                for item in items[sent:]:
+                    yield f"event: {progressive_key}\ndata: {orjson.dumps(item).decode()}\n\n"
+                    sent += 1
+        yield f"event: result\ndata: {orjson.dumps(service.finalize_content(streamed, q)).decode()}\n\n"
     except Exception as e:
-        # Catch any other unexpected errors
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+        yield f"event: error\ndata: {orjson.dumps(str(e)).decode()}\n\n"
+    yield "data: [DONE]\n\n"
 
 
-@app.post("/philosophy-comfort", response_model=PhilosophyComfortResponse)
-def philosophy_comfort(q: PhilosophyComfortQuery):
-    # Basic validation
-    if not os.environ.get("OPENAI_API_KEY"):
-        raise HTTPException(status_code=500, detail="Server missing OPENAI_API_KEY")
+@app.post("/bible-comfort/stream")
+async def bible_comfort_stream(q: BibleComfortQuery):
+    _require_openai_key()
+
+    return StreamingResponse(
+        _comfort_event_stream(comfort_service, q, progressive_key="passages"),
+        media_type="text/event-stream",
+    )
+
+
+@app.post("/bible-comfort/batch", responses={200: {"model": BibleComfortBatch}})
+async def bible_comfort_batch(
+    queries: Annotated[List[BibleComfortQuery], Field(min_length=1, max_length=MAX_BATCH_QUERIES)],
+):
+    _require_openai_key()
+
+    return _json_response(await comfort_service.submit_batch(queries))
+
+
+@app.get("/bible-comfort/batch/{batch_id}", responses={200: {"model": BibleComfortBatch}})
+async def bible_comfort_batch_status(batch_id: str):
+    _require_openai_key()
 
     try:
-        result = philosophy_service.get_comfort(q)
-        return result
-    except (ValueError, RuntimeError) as e:
-        raise HTTPException(status_code=502, detail=str(e))
-    except Exception as e:
-        # Catch any other unexpected errors
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+        return _json_response(await comfort_service.get_batch(batch_id))
+    except BatchNotFoundError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+
+@app.post("/philosophy-comfort", responses={200: {"model": PhilosophyComfortResponse}})
+async def philosophy_comfort(q: PhilosophyComfortQuery):
+    _require_openai_key()
+
+    result, hit = await philosophy_service.get_comfort_with_cache_status(q)
+    return _json_response(result, headers=_cache_headers(hit))
+
+
+@app.post("/philosophy-comfort/stream")
+async def philosophy_comfort_stream(q: PhilosophyComfortQuery):
+    _require_openai_key()
+
+    return StreamingResponse(_comfort_event_stream(philosophy_service, q), media_type="text/event-stream")
+
+
+@app.post("/combined-comfort", responses={200: {"model": CombinedComfortResponse}})
+async def combined_comfort(q: BibleComfortQuery):
+    _require_openai_key()
+
+    # One OpenAI call answers both panels instead of two parallel calls.
+    return _json_response(await combined_service.get_combined(q))
 
 
 @app.post("/tts")
-def tts(req: TTSRequest):
-    if not os.environ.get("OPENAI_API_KEY"):
-        raise HTTPException(status_code=500, detail="Server missing OPENAI_API_KEY")
+async def tts(req: TTSRequest, request: Request):
+    _require_openai_key()
 
+    fmt, media_type = tts_service.resolve_format(req.format)
+    language = req.language or "zh"
     try:
-        temp_path, media_type = tts_service.generate_audio(
+        key = tts_service.cache_key(req.text, language, req.voice, fmt)
+    except TextTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=502, detail=f"TTS failed: {e}")
+
+    # Identical (text, voice, language, format) always yields the same audio.
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # Cached audio is served from its content-addressed URL, which browsers may cache forever.
+    if tts_cache.get(key, fmt) is not None:
+        return RedirectResponse(f"/tts/{key}.{fmt}", status_code=303)
+
+    # Concurrent requests for the same audio share one synthesis.
+    audio = tts_cache.stream(
+        key,
+        fmt,
+        lambda: tts_service.generate_audio(
             text=req.text,
-            language=req.language or "zh",
+            language=language,
             voice=req.voice,
-            fmt=req.format or "mp3",
-        )
-
-        def file_iterator(path: str, chunk_size: int = 8192):
-            with open(path, "rb") as f:
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield chunk
-            try:
-                os.remove(path)
-            except Exception:
-                pass
-        return StreamingResponse(file_iterator(temp_path), media_type=media_type)
+            fmt=fmt,
+        ),
+    )
 
+    # Pull the first chunk before responding so upstream failures still map to 502.
+    try:
+        first_chunk = await anext(audio, b"")
     except Exception as e:
-        # Clean up temp file if allocation happened but streaming failed
-        try:
-            if 'temp_path' in locals() and os.path.exists(temp_path):
-                os.remove(temp_path)
-        except Exception:
-            pass
         raise HTTPException(status_code=502, detail=f"TTS failed: {e}")
+
+    async def audio_stream():
+        yield first_chunk
+        async for chunk in audio:
+            yield chunk
+
+    return StreamingResponse(audio_stream(), media_type=media_type, headers=headers)
+
+
+@app.get("/tts/{key}.{fmt}")
+async def tts_audio(key: str, fmt: str, request: Request):
+    # Only well-formed keys reach the cache path and the immutable headers.
+    if not re.fullmatch(r"[0-9a-f]{64}", key) or fmt != tts_service.resolve_format(fmt)[0]:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    # The URL is a hash of everything that determines the audio, so it never changes.
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    cached_path = tts_cache.get(key, fmt)
+    if cached_path is None:
+        raise HTTPException(status_code=404, detail="Audio not cached; POST /tts to synthesize it")
+    return FileResponse(cached_path, media_type=tts_service.resolve_format(fmt)[1], headers=headers)
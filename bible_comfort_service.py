@@ -1,9 +1,12 @@
-import json
-import os
+import functools
+import re
+from itertools import islice
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
-from openai import OpenAI
-from comfort_search import DuckDuckGoSearchProvider, SearchFindingsFormatter, SearchProvider
+from pydantic import BaseModel, ValidationError
+import orjson
+from openai import AsyncOpenAI, NotFoundError
+from comfort_base import COMFORT_MODEL, BaseComfortService, json_schema_format
+from comfort_search import DuckDuckGoSearchProvider  # noqa: F401  (re-exported; tests patch it here)
 
 # DONE: Update "Optional Guidance" from input box to combo box, add couple of common used candidates option for this particular bible comfort use cases. Put this to the top: 列举一个最类似处境的圣经正面人物 详细说明他们的类似经历
 
@@ -11,14 +14,18 @@ from comfort_search import DuckDuckGoSearchProvider, SearchFindingsFormatter, Se
 
 # DONE: Check @负伤的治疗者.txt. Did you implement all suggestion in that file to current code?
 
-def _init_openai_client() -> Optional[OpenAI]:
-    """Initialize OpenAI client if API key is available; otherwise return None.
-    Avoids raising during module import so unit tests can run without network/keys.
-    """
-    try:
-        return OpenAI()
-    except Exception:
-        return None
+_WORD_RE = re.compile(r"\S+")
+
+# Upper bound on queries per batch job; each one is a paid completion.
+MAX_BATCH_QUERIES = 50
+
+# Tags the batch jobs submit_batch creates, so get_batch never exposes other jobs on the account.
+_BATCH_METADATA = {"source": "bible-comfort"}
+_BATCH_CUSTOM_ID_RE = re.compile(r"(\d+):(\d+):(.+)")
+
+
+class BatchNotFoundError(LookupError):
+    """Raised for batch ids that do not exist or were not created by submit_batch."""
 
 
 class BibleComfortQuery(BaseModel):
@@ -38,12 +45,40 @@ class BiblePassage(BaseModel):
 
 
 class BibleComfortResponse(BaseModel):
-    passages: List[BiblePassage]
+    # Defaults let a partial model reply parse; the disclaimer default is filled per language.
+    passages: List[BiblePassage] = []
     presence_sentence: str = ""
-    devotional: str
-    prayer: str
+    devotional: str = ""
+    prayer: str = ""
     next_step: str = ""
-    disclaimer: str
+    disclaimer: str = ""
+
+
+class BibleComfortBatchResult(BaseModel):
+    index: int
+    response: Optional[BibleComfortResponse] = None
+    error: str = ""
+
+
+class BibleComfortBatch(BaseModel):
+    id: str
+    status: str
+    results: List[BibleComfortBatchResult] = []
+
+
+def _max_passages(q: BibleComfortQuery) -> int:
+    return max(1, min(q.max_passages, 10))
+
+
+def _trim_short_quote(p: BiblePassage, is_zh: bool) -> None:
+    sq = p.short_quote.strip()
+    if is_zh:
+        if len(sq) > 40:
+            p.short_quote = ""
+    # More than 20 words needs at least 41 characters, so shorter quotes skip the count;
+    # longer ones stop scanning at the 21st word.
+    elif len(sq) > 40 and next(islice(_WORD_RE.finditer(sq), 20, None), None) is not None:
+        p.short_quote = ""
 
 
 WOUNDED_HEALER_ROLE_PROMPT = """You are not a problem solver, but a compassionate Christian companion.
@@ -67,212 +102,192 @@ WOUNDED_HEALER_CONTENT_GUIDANCE = """- Begin with a brief presence sentence that
 
 SYSTEM_PROMPT = f"""You are a Christian pastoral counselor and Bible study assistant serving a Christian audience.
 {WOUNDED_HEALER_ROLE_PROMPT}
-You MUST respond STRICTLY in the user's requested language (zh for Chinese, en for English).
-DO NOT mix languages. All output, including Bible references, must be in the selected language.
-
-Tone and style (professional, Scripture-centered):
-- Use respectful, clear, pastoral language with a measured, professional tone.
-- Ground counsel in Scripture and historic Christian understanding; avoid interfaith syncretism.
-- Lead with empathy without over-emphasizing therapeutic language; avoid clichés and platitudes.
-- Be concise and structured; avoid debates and speculative theology.
+Respond ONLY in the user's requested language (zh = Chinese, en = English), including Bible references and book names; never mix languages.
+
+Tone:
+- Respectful, clear, pastoral and Scripture-centered; no interfaith syncretism, clichés, platitudes, debates or speculative theology.
+- Lead with empathy without leaning on therapeutic language or techniques.
 - Do not rush into fixing or explaining.
 - Avoid over-explaining or giving theological analysis.
 
-Verse accuracy requirements:
-- Ensure every reference (book name, chapter:verse range) is accurate and commonly recognized in the requested language.
-- Use localized book names (Chinese for zh, English for en).
-- Provide full_passage_text verbatim from a public-domain translation: WEB for English, CUV for Chinese.
-- Do NOT paraphrase in full_passage_text; ensure it matches the cited reference precisely.
-- If unsure about a verse, choose a different passage you are confident is correct. Never invent verses or numbers.
-
-Content requirements:
-- Propose Bible passages (book chapter:verse) that fit the user's situation.
-- For short_quote: give at most a very brief paraphrase (<= 20 words/chars) or leave empty.
-- Write a pastoral devotional (500–700 zh characters / 500–700 English words) with a professional tone for Christians.
-- Begin the devotional with 1–2 empathetic sentences, then provide Scripture-based reflection or healing.
+Verse accuracy:
+- References (book chapter:verse) must be accurate and commonly recognized. Never invent verses or numbers; if unsure, choose a passage you are sure of.
+- full_passage_text is verbatim from a public-domain translation (WEB for en, CUV for zh) and matches the reference exactly. No long quotes from copyrighted translations.
+
+Content:
 {WOUNDED_HEALER_CONTENT_GUIDANCE}
-- Avoid heavy emphasis on therapeutic techniques; keep the focus on biblical encouragement and practical wisdom.
-- When web search findings are provided, use them to gather relevant current context such as news, Reddit posts, public discussions, and situational background.
-- Use those web search findings to provide more accurate and relevant comfort, including better-matched passages, devotional reflection, and prayer.
-- In the devotional, explicitly mention at least one concrete external detail from web search findings when available.
-- In the prayer, explicitly mention at least one concrete external detail from web search findings when available.
-- If web search findings include company names, platform names, source types, or public discussion themes, prefer to mention those exact details rather than generic wording.
-- Use web search findings wisely inside devotional and prayer part to connect with the user's current reality, but do not let them overshadow Scripture as the primary authority.
-
-Output rules:
-- Return STRICT JSON only, matching the schema the user supplies.
-- Use only the requested language for all content and references.
-- Do NOT include long verbatim quotes from copyrighted translations (only WEB/CUV for full_passage_text).
+- When web search findings are provided (news, Reddit posts, public discussions), use them for more accurate and relevant comfort: better-matched passages, devotional and prayer.
+- In the devotional and in the prayer, explicitly mention at least one concrete external detail from the findings, preferring exact company names, platform names, source types or discussion themes over generic wording.
+- Scripture stays the primary authority; findings are background only.
 """
 
 
-USER_PROMPT_TMPL = """User language: {language}
+# Built once so every request sends a byte-identical system prefix (provider prompt caching).
+# Shared across requests: callers must treat it as read-only.
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+# The user prompt is a pure function of the query fields; repeat queries (refreshes,
+# retries, cache-key hashing followed by the real call) reuse the rendered string.
+@functools.lru_cache(maxsize=1024)
+def _render_user_prompt(
+    language: str, faith_background: str, situation: str, guidance: str, max_passages: int
+) -> str:
+    lang_unit = "characters" if language.startswith("zh") else "words"
+    return f"""User language: {language}
 Faith background: {faith_background}
 Situation detail: {situation}
 Additional guidance: {guidance}
 
-Return JSON with fields:
-- passages: array of at most {max_passages} objects with fields:
-  - ref (string, e.g., "Psalm 46:1-3" or localized equivalent)
-  - short_quote (string, <= 20 words/chars; a minimal paraphrase; MAY be empty)
-  - reason (string, 1–2 sentences explaining why this passage fits)
-  - full_passage_text (string, VERBATIM full text from a public-domain version. Use WEB for English; use CUV for Chinese. Ensure the verses exactly match the cited reference.)
+Fields:
+- passages: at most {max_passages}; ref like "Psalm 46:1-3" (localized); short_quote a minimal paraphrase of <= 20 words/chars, may be empty; reason in 1–2 sentences.
 - presence_sentence: one brief sentence of companionship that acknowledges the pain without rushing to fix or explain it.
-- devotional: a 300–500 {lang_unit} pastoral reflection for Christians, professional in tone; begin with 1–2 empathetic sentences, then provide Scripture-based reflection / healing.
+- devotional: 300–500 {lang_unit}; open with 1–2 empathetic sentences, then Scripture-based reflection and healing.
 - prayer: 4–8 sentences, reverent and concise.
-- next_step: one gentle, practical next step that encourages connection with a trusted Christian person or community when appropriate.
-- disclaimer: one sentence kindly asking the user to verify in their preferred translation.
+- next_step: one gentle, practical step toward a trusted Christian person or community.
+- disclaimer: one sentence asking the user to verify in their preferred translation.
+"""
 
-If web search findings are included below, use them to understand the user's current reality more precisely, including relevant news, Reddit posts, and public discussion themes. Use them to improve relevance, but keep Scripture as the primary authority and do not invent facts.
-If the web search findings include company names, platform names, source types, or public discussion themes, explicitly mention at least one or two of those details in the devotional and at least one in the prayer when natural to do so.
 
-Use the requested language for everything.
-"""
-class BibleComfortService:
+# Filled in when the model leaves the disclaimer empty.
+_DEFAULT_DISCLAIMER_ZH = "请在你常用的圣经译本中核对经文原文与上下文；以上解读仅作灵修参考。"
+_DEFAULT_DISCLAIMER_EN = (
+    "Please verify these references in your preferred Bible translation; the reflection is for devotional support."
+)
+
+
+class BibleComfortService(BaseComfortService):
     """Service responsible for building prompts and calling the OpenAI API."""
 
-    def __init__(
-        self,
-        openai_client: Optional[OpenAI] = None,
-        search_provider: Optional[SearchProvider] = None,
-    ) -> None:
-        self.client: Optional[OpenAI] = openai_client or _init_openai_client()
-        self.search_provider = search_provider or DuckDuckGoSearchProvider.from_env()
-        self._search_findings_formatter = SearchFindingsFormatter()
-
-    def build_messages(
-        self,
-        q: BibleComfortQuery,
-        search_context: str = "",
-    ) -> List[Dict[str, str]]:
-        lang_unit = "characters" if q.language.startswith("zh") else "words"
-        uprompt = USER_PROMPT_TMPL.format(
-            language=q.language,
-            faith_background=q.faith_background or "christian",
-            situation=q.situation,
-            guidance=q.guidance or "None",
-            max_passages=max(1, min(q.max_passages, 10)),
-            lang_unit=lang_unit,
-        )
-        ## DONE: I want to have a checkbox in the UI to enable web search context. If not checked (by default), we should not call the search provider at all and can skip appending search context to the prompt. If enabled, the default waiting time is around 40 sec
-        uprompt = self._append_search_context(uprompt, search_context)
-        return [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": uprompt},
-        ]
+    system_message = _SYSTEM_MESSAGE
+    response_model = BibleComfortResponse
+    search_model_env = "BIBLE_COMFORT_SEARCH_MODEL"
+    search_usage_note = (
+        "Use these findings only as supporting background; keep Scripture as the primary authority and do not invent facts.\n"
+        "If the web search findings include company names, platform names, source types, or public discussion themes, "
+        "explicitly mention at least one or two of those details in the devotional and at least one in the prayer when natural to do so."
+    )
 
-    def _append_search_context(self, prompt: str, search_context: str) -> str:
-        if not search_context.strip():
-            return prompt
-
-        return (
-            f"{prompt}\n"
-            "Web search findings:\n"
-            f"{search_context.strip()}\n\n"
-            "When web search findings contain concrete details beyond the user's own wording, "
-            "use at least one new external detail in the devotional and at least one in the prayer when relevant.\n"
-            "Use these findings only as supporting background. "
-            "Prioritize biblically faithful, situation-relevant passages, devotional guidance, and prayer."
+    def render_user_prompt(self, q: BibleComfortQuery) -> str:
+        ## DONE: I want to have a checkbox in the UI to enable web search context. If not checked (by default), we should not call the search provider at all and can skip appending search context to the prompt. If enabled, the default waiting time is around 40 sec
+        return _render_user_prompt(
+            q.language,
+            q.faith_background or "christian",
+            q.situation,
+            q.guidance or "None",
+            _max_passages(q),
         )
 
-    def _build_web_search_prompt(self, q: BibleComfortQuery) -> str:
-        return (
-            "Search the web for recent and concrete context related to the user's situation. "
-            "Focus on news, Reddit posts, and public discussion. "
-            "Prefer details beyond the user's own wording, including named companies, source types, and specific concerns people are discussing.\n\n"
-            f"User language: {q.language}\n"
-            f"Faith background: {q.faith_background or 'christian'}\n"
-            f"Situation detail: {q.situation}\n"
-            f"Additional guidance: {q.guidance or 'None'}\n\n"
-            "Return concise plain text with exactly these sections:\n"
-            "News findings:\n"
-            "- ...\n"
-            "Reddit/public discussion findings:\n"
-            "- ...\n"
-            "Named entities:\n"
-            "- ...\n"
+    def background_line(self, q: BibleComfortQuery) -> str:
+        return f"Faith background: {q.faith_background or 'christian'}"
+
+    def _finalize_response(self, resp: BibleComfortResponse, q: BibleComfortQuery) -> Dict[str, Any]:
+        # Constraint: Trim passages count and short quote length to avoid copyright/length issues
+        resp.passages = resp.passages[:_max_passages(q)]
+        is_zh = q.language.startswith("zh")
+        for p in resp.passages:
+            _trim_short_quote(p, is_zh)
+
+        if not resp.disclaimer:
+            resp.disclaimer = _DEFAULT_DISCLAIMER_ZH if is_zh else _DEFAULT_DISCLAIMER_EN
+
+        return resp.model_dump()
+
+    def finalize_stream_items(self, key: str, items: List[Any], q: BibleComfortQuery) -> List[Dict[str, Any]]:
+        if key != "passages":
+            return items
+        is_zh = q.language.startswith("zh")
+        passages = []
+        for item in items[:_max_passages(q)]:
+            try:
+                p = BiblePassage.model_validate(item)
+            except ValidationError:
+                break  # skipping it would shift the index of every later passage
+            _trim_short_quote(p, is_zh)
+            passages.append(p.model_dump())
+        return passages
+
+    def _batch_custom_id(self, index: int, q: BibleComfortQuery) -> str:
+        # Batch output only echoes custom_id, so it carries what post-processing needs.
+        return f"{index}:{q.max_passages}:{q.language}"
+
+    async def submit_batch(
+        self, queries: List[BibleComfortQuery], *, openai_client: Optional[AsyncOpenAI] = None
+    ) -> Dict[str, Any]:
+        """Submit queries as one OpenAI Batch API job (half price, separate rate limits).
+
+        Web search context is not gathered for batch jobs.
+        """
+        oc = openai_client or self.client
+        if oc is None:
+            raise RuntimeError("OpenAI client not configured")
+
+        lines = [
+            orjson.dumps(
+                {
+                    "custom_id": self._batch_custom_id(index, q),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": COMFORT_MODEL,
+                        "messages": self.build_messages(q),
+                        "response_format": json_schema_format(BibleComfortResponse),
+                    },
+                },
+            )
+            for index, q in enumerate(queries)
+        ]
+        batch_file = await oc.files.create(
+            file=("bible_comfort_batch.jsonl", b"\n".join(lines)),
+            purpose="batch",
         )
-
-    def _search_with_openai_web(self, oc: OpenAI, q: BibleComfortQuery) -> str:
-        responses_api = getattr(oc, "responses", None)
-        if responses_api is None:
-            return ""
-
-        result = responses_api.create(
-            model=os.getenv("BIBLE_COMFORT_SEARCH_MODEL", "gpt-5"),
-            tools=[{"type": "web_search"}],
-            input=self._build_web_search_prompt(q),
+        batch = await oc.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata=_BATCH_METADATA,
         )
-        return (getattr(result, "output_text", "") or "").strip()
-
-    def _format_search_findings(self, search_context: str) -> str:
-        return self._search_findings_formatter.format(search_context)
-
-    def _should_use_web_search(self, q: BibleComfortQuery) -> bool:
-        return q.enable_web_search
-
-    def _get_search_context(self, q: BibleComfortQuery, oc: OpenAI) -> str:
-        if not self._should_use_web_search(q):
-            return ""
-        if self.search_provider is not None:
-            search_context = self.search_provider.search(q)
-            if isinstance(self.search_provider, DuckDuckGoSearchProvider):
-                return self._format_search_findings(search_context)
-            return search_context
-        return self._search_with_openai_web(oc, q)
-
-    def _apply_response_defaults(self, data: Dict[str, Any], q: BibleComfortQuery) -> Dict[str, Any]:
-        for key in ("presence_sentence", "devotional", "prayer", "next_step"):
-            data.setdefault(key, "")
-
-        if not data.get("disclaimer"):
-            data["disclaimer"] = (
-                "请在你常用的圣经译本中核对经文原文与上下文；以上解读仅作灵修参考。"
-                if q.language.startswith("zh")
-                else "Please verify these references in your preferred Bible translation; the reflection is for devotional support."
-            )
+        return {"id": batch.id, "status": batch.status, "results": []}
 
-        return data
+    async def get_batch(
+        self, batch_id: str, *, openai_client: Optional[AsyncOpenAI] = None
+    ) -> Dict[str, Any]:
+        """Return batch status, plus parsed responses once the job has completed."""
+        oc = openai_client or self.client
+        if oc is None:
+            raise RuntimeError("OpenAI client not configured")
 
-    def get_comfort(self, q: BibleComfortQuery, *, openai_client: Optional[OpenAI] = None) -> Dict[str, Any]:
-        """
-        Builds the prompt, calls the OpenAI API, and processes the response.
-        Returns a dict that matches BibleComfortResponse schema.
-        """
         try:
-            oc = openai_client or self.client
-            if oc is None:
-                raise RuntimeError("OpenAI client not configured")
-
-            messages = self.build_messages(q, search_context=self._get_search_context(q, oc))
-
-            resp = oc.chat.completions.create(
-                model="gpt-5-mini",
-                messages=messages,
-                response_format={"type": "json_object"},
-            )
-            content = resp.choices[0].message.content
+            batch = await oc.batches.retrieve(batch_id)
+        except NotFoundError as e:
+            raise BatchNotFoundError(batch_id) from e
+        if (batch.metadata or {}).get("source") != _BATCH_METADATA["source"]:
+            raise BatchNotFoundError(batch_id)
+
+        results: List[Dict[str, Any]] = []
+        if batch.status == "completed" and batch.output_file_id:
+            output = await oc.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if line.strip():
+                    result = self._parse_batch_line(orjson.loads(line))
+                    if result is not None:
+                        results.append(result)
+            results.sort(key=lambda result: result["index"])
+
+        return {"id": batch.id, "status": batch.status, "results": results}
+
+    def _parse_batch_line(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        match = _BATCH_CUSTOM_ID_RE.fullmatch(str(row.get("custom_id", "")))
+        if match is None:
+            return None  # not a row written by submit_batch
+        index, max_passages, language = match.groups()
+        q = BibleComfortQuery(language=language, situation="", max_passages=int(max_passages))
+        try:
+            if row.get("error"):
+                raise ValueError(row["error"].get("message") or "Batch request failed")
+            content = row["response"]["body"]["choices"][0]["message"]["content"]
             if not content:
                 raise ValueError("LLM returned empty content")
-
-            data = json.loads(content)
-
-            # Constraint: Trim passages count and short quote length to avoid copyright/length issues
-            max_passages = max(1, min(q.max_passages, 10))
-            passages = (data.get("passages") or [])[:max_passages]
-            for p in passages:
-                sq = (p.get("short_quote") or "").strip()
-                if q.language.startswith("zh"):
-                    if len(sq) > 40:
-                        p["short_quote"] = ""
-                else:
-                    if len(sq.split()) > 20:
-                        p["short_quote"] = ""
-            data["passages"] = passages
-
-            return self._apply_response_defaults(data, q)
-
-        except json.JSONDecodeError as e:
-            raise ValueError(f"LLM returned invalid JSON: {e}") from e
-        except Exception as e:
-            raise RuntimeError(f"LLM API call failed: {e}") from e
+            return {"index": int(index), "response": self._finalize_response(BibleComfortResponse.model_validate_json(content), q)}
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            return {"index": int(index), "response": None, "error": str(e)}
@@ -0,0 +1,116 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ValidationError
+from openai import AsyncOpenAI, OpenAIError
+from openai_calls import create_chat_completion
+from comfort_base import json_schema_format
+from bible_comfort_service import (
+    COMFORT_MODEL,
+    SYSTEM_PROMPT as BIBLE_SYSTEM_PROMPT,
+    BibleComfortQuery,
+    BibleComfortResponse,
+    BibleComfortService,
+)
+from philosophy_comfort_service import (
+    SYSTEM_PROMPT as PHILOSOPHY_SYSTEM_PROMPT,
+    PhilosophyComfortQuery,
+    PhilosophyComfortResponse,
+    PhilosophyComfortService,
+)
+
+
+class CombinedComfortResponse(BaseModel):
+    bible: BibleComfortResponse = BibleComfortResponse()
+    philosophy: PhilosophyComfortResponse = PhilosophyComfortResponse()
+
+
+# Both roles in one system message, so a single request answers both panels.
+SYSTEM_PROMPT = f"""You will answer the same situation twice, in two separate roles.
+
+--- ROLE 1 ---
+{BIBLE_SYSTEM_PROMPT}
+
+--- ROLE 2 ---
+{PHILOSOPHY_SYSTEM_PROMPT}
+
+Keep the two roles independent: ROLE 1 output must not borrow ROLE 2's voice and vice versa.
+Return ONE JSON object: {{"bible": <ROLE 1 JSON>, "philosophy": <ROLE 2 JSON>}}.
+"""
+
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+class CombinedComfortService:
+    """Generate bible and philosophy comfort for one situation with a single OpenAI call.
+
+    Prompt building and post-processing are delegated to the two single-role services.
+    """
+
+    def __init__(
+        self,
+        bible_service: BibleComfortService,
+        philosophy_service: PhilosophyComfortService,
+        openai_client: Optional[AsyncOpenAI] = None,
+    ) -> None:
+        self.bible_service = bible_service
+        self.philosophy_service = philosophy_service
+        self.client: Optional[AsyncOpenAI] = openai_client or bible_service.client
+
+    def philosophy_query(self, q: BibleComfortQuery) -> PhilosophyComfortQuery:
+        return PhilosophyComfortQuery(
+            language=q.language,
+            situation=q.situation,
+            enable_web_search=q.enable_web_search,
+        )
+
+    def build_messages(self, q: BibleComfortQuery, search_context: str = "") -> List[Dict[str, str]]:
+        # Render both tasks without the findings, then attach them once with each role's usage note.
+        bible_prompt = self.bible_service.build_messages(q)[1]["content"]
+        philosophy_prompt = self.philosophy_service.build_messages(self.philosophy_query(q))[1]["content"]
+        uprompt = f"ROLE 1 task:\n{bible_prompt}\n--- ROLE 2 task:\n{philosophy_prompt}"
+        if search_context.strip():
+            uprompt = (
+                f"{uprompt}\n"
+                "Web search findings (shared by both roles):\n"
+                f"{search_context.strip()}\n\n"
+                f"ROLE 1: {self.bible_service.search_usage_note}\n"
+                f"ROLE 2: {self.philosophy_service.search_usage_note}"
+            )
+        return [
+            _SYSTEM_MESSAGE,
+            {"role": "user", "content": uprompt},
+        ]
+
+    async def get_combined(
+        self, q: BibleComfortQuery, *, openai_client: Optional[AsyncOpenAI] = None
+    ) -> Dict[str, Any]:
+        """Return {"bible": <BibleComfortResponse dict>, "philosophy": <PhilosophyComfortResponse dict>}."""
+        try:
+            oc = openai_client or self.client
+            if oc is None:
+                raise RuntimeError("OpenAI client not configured")
+
+            # Search once; both prompts see the same findings.
+            search_context = await self.bible_service._get_search_context(q, oc)
+            resp = await create_chat_completion(
+                oc,
+                model=COMFORT_MODEL,
+                messages=self.build_messages(q, search_context),
+                response_format=json_schema_format(CombinedComfortResponse),
+                prompt_cache_key=type(self).__name__,
+            )
+            content = resp.choices[0].message.content
+            if not content:
+                raise ValueError("LLM returned empty content")
+
+            combined = CombinedComfortResponse.model_validate_json(content)
+            return {
+                "bible": self.bible_service._finalize_response(combined.bible, q),
+                "philosophy": self.philosophy_service._finalize_response(combined.philosophy, self.philosophy_query(q)),
+            }
+
+        except ValidationError as e:
+            raise ValueError(f"LLM returned invalid JSON: {e}") from e
+        except OpenAIError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"LLM API call failed: {e}") from e
@@ -0,0 +1,260 @@
+import asyncio
+import functools
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from pydantic_core import from_json
+from openai import AsyncOpenAI, OpenAIError
+from openai_calls import create_chat_completion, init_openai_client
+from comfort_cache import LLMCache, cache_key, normalize_text
+from comfort_search import DuckDuckGoSearchProvider, SearchFindingsFormatter, SearchProvider
+
+
+COMFORT_MODEL = "gpt-5-mini"
+
+
+def _strict_schema(node: Any) -> Any:
+    # Structured Outputs' strict mode wants every property required, no extras and no defaults.
+    if isinstance(node, dict):
+        node = {k: _strict_schema(v) for k, v in node.items() if k != "default"}
+        if node.get("type") == "object" and "properties" in node:
+            node["required"] = list(node["properties"])
+            node["additionalProperties"] = False
+        return node
+    if isinstance(node, list):
+        return [_strict_schema(v) for v in node]
+    return node
+
+
+@functools.lru_cache(maxsize=None)
+def json_schema_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """response_format that makes the API enforce `model`'s structure, so prompts need not spell it out.
+
+    Cached per model: shared across requests, callers must treat it as read-only.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": _strict_schema(model.model_json_schema()), "strict": True},
+    }
+
+
+def completed_items(partial_json: str, key: str) -> List[Any]:
+    """Items of the top-level list `key` that are already complete in a streamed JSON prefix.
+
+    The last item is only counted once the model has moved past it (another item or
+    a later key has started), so callers never see a half-written object.
+    """
+    try:
+        parsed = from_json(partial_json, allow_partial="trailing-strings")
+    except ValueError:
+        return []
+    if not isinstance(parsed, dict) or not isinstance(parsed.get(key), list):
+        return []
+    items = parsed[key]
+    return items if list(parsed)[-1] != key else items[:-1]
+
+
+class BaseComfortService:
+    """Shared prompt/search/cache/LLM pipeline for the comfort services.
+
+    Subclasses supply the prompts and the response model; everything else
+    (web search context, caching, the OpenAI call and JSON validation) lives here.
+    """
+
+    # Set by subclasses.
+    system_message: Dict[str, str]
+    response_model: Type[BaseModel]
+    search_model_env: str
+    # Appended after web search findings; tells the model how to use them.
+    search_usage_note: str
+
+    def __init__(
+        self,
+        openai_client: Optional[AsyncOpenAI] = None,
+        search_provider: Optional[SearchProvider] = None,
+        cache: Optional[LLMCache] = None,
+    ) -> None:
+        self.client: Optional[AsyncOpenAI] = openai_client or init_openai_client()
+        self.search_provider = search_provider or DuckDuckGoSearchProvider.from_env()
+        self.cache = cache
+        self._search_findings_formatter = SearchFindingsFormatter()
+
+    def render_user_prompt(self, q: Any) -> str:
+        raise NotImplementedError
+
+    def background_line(self, q: Any) -> str:
+        """The 'X background: ...' line used in the web search prompt."""
+        raise NotImplementedError
+
+    def _finalize_response(self, resp: Any, q: Any) -> Dict[str, Any]:
+        return resp.model_dump()
+
+    def finalize_content(self, content: str, q: Any) -> Dict[str, Any]:
+        """Validate a full model reply and apply the same rules get_comfort does."""
+        try:
+            return self._finalize_response(self.response_model.model_validate_json(content), q)
+        except ValidationError as e:
+            raise ValueError(f"LLM returned invalid JSON: {e}") from e
+
+    def finalize_stream_items(self, key: str, items: List[Any], q: Any) -> List[Any]:
+        """Apply _finalize_response's per-item rules to the `key` list items completed mid-stream."""
+        return items
+
+    def build_messages(self, q: Any, search_context: str = "") -> List[Dict[str, str]]:
+        uprompt = self._append_search_context(self.render_user_prompt(q), search_context)
+        return [
+            self.system_message,
+            {"role": "user", "content": uprompt},
+        ]
+
+    def _append_search_context(self, prompt: str, search_context: str) -> str:
+        if not search_context.strip():
+            return prompt
+
+        return (
+            f"{prompt}\n"
+            "Web search findings:\n"
+            f"{search_context.strip()}\n\n"
+            f"{self.search_usage_note}"
+        )
+
+    def _build_web_search_prompt(self, q: Any) -> str:
+        return (
+            "Search the web for recent and concrete context related to the user's situation. "
+            "Focus on news, Reddit posts, and public discussion. "
+            "Prefer details beyond the user's own wording, including named companies, source types, and specific concerns people are discussing.\n\n"
+            f"User language: {q.language}\n"
+            f"{self.background_line(q)}\n"
+            f"Situation detail: {q.situation}\n"
+            f"Additional guidance: {q.guidance or 'None'}\n\n"
+            "Return concise plain text with exactly these sections:\n"
+            "News findings:\n"
+            "- ...\n"
+            "Reddit/public discussion findings:\n"
+            "- ...\n"
+            "Named entities:\n"
+            "- ...\n"
+        )
+
+    async def _search_with_openai_web(self, oc: AsyncOpenAI, q: Any) -> str:
+        responses_api = getattr(oc, "responses", None)
+        if responses_api is None:
+            return ""
+
+        result = await responses_api.create(
+            model=os.getenv(self.search_model_env, "gpt-5"),
+            tools=[{"type": "web_search"}],
+            input=self._build_web_search_prompt(q),
+        )
+        return (getattr(result, "output_text", "") or "").strip()
+
+    def _format_search_findings(self, search_context: str) -> str:
+        return self._search_findings_formatter.format(search_context)
+
+    def _should_use_web_search(self, q: Any) -> bool:
+        return q.enable_web_search
+
+    async def _get_search_context(self, q: Any, oc: AsyncOpenAI) -> str:
+        if not self._should_use_web_search(q):
+            return ""
+        if self.search_provider is not None:
+            # Search providers are synchronous; keep them off the event loop.
+            search_context = await asyncio.to_thread(self.search_provider.search, q)
+            if isinstance(self.search_provider, DuckDuckGoSearchProvider):
+                return self._format_search_findings(search_context)
+            return search_context
+        return await self._search_with_openai_web(oc, q)
+
+    def _cache_key(self, q: Any) -> str:
+        # Whitespace/case variants of the same situation (reloads, retries) share one entry.
+        normalized = q.model_copy(
+            update={"situation": normalize_text(q.situation), "guidance": normalize_text(q.guidance or "")}
+        )
+        return cache_key(
+            COMFORT_MODEL,
+            self.build_messages(normalized),
+            enable_web_search=q.enable_web_search,
+        )
+
+    def _cache_scope(self, q: Any) -> str:
+        return q.model_dump_json(exclude={"situation", "guidance"})
+
+    async def get_comfort(self, q: Any, *, openai_client: Optional[AsyncOpenAI] = None) -> Dict[str, Any]:
+        """Build prompts, call the OpenAI API, and return a dict matching response_model."""
+        result, _ = await self.get_comfort_with_cache_status(q, openai_client=openai_client)
+        return result
+
+    async def get_comfort_with_cache_status(
+        self, q: Any, *, openai_client: Optional[AsyncOpenAI] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Like get_comfort, but also report whether the result was served from the cache."""
+        try:
+            oc = openai_client or self.client
+            if oc is None:
+                raise RuntimeError("OpenAI client not configured")
+
+            if self.cache is not None:
+                key = self._cache_key(q)
+                similarity_text = f"{q.situation}\n{q.guidance or ''}"
+                cached = await self.cache.get(key, text=similarity_text, scope=self._cache_scope(q))
+                if cached is not None:
+                    return cached, True
+
+            messages = self.build_messages(q, search_context=await self._get_search_context(q, oc))
+
+            # The system message is a constant, so every request shares a cacheable prefix;
+            # prompt_cache_key keeps each service's requests routed to the same cache.
+            resp = await create_chat_completion(
+                oc,
+                model=COMFORT_MODEL,
+                messages=messages,
+                response_format=json_schema_format(self.response_model),
+                prompt_cache_key=type(self).__name__,
+            )
+            content = resp.choices[0].message.content
+            if not content:
+                raise ValueError("LLM returned empty content")
+
+            # Parsed and validated in one pass, straight from the JSON text.
+            result = self._finalize_response(self.response_model.model_validate_json(content), q)
+            if self.cache is not None:
+                await self.cache.set(key, result, text=similarity_text, scope=self._cache_scope(q))
+            return result, False
+
+        except ValidationError as e:
+            raise ValueError(f"LLM returned invalid JSON: {e}") from e
+        except OpenAIError:
+            # Surfaced as-is so app.py can map it to a precise HTTP status.
+            raise
+        except Exception as e:
+            raise RuntimeError(f"LLM API call failed: {e}") from e
+
+    async def stream_comfort(self, q: Any, *, openai_client: Optional[AsyncOpenAI] = None) -> AsyncIterator[str]:
+        """Stream the raw JSON response text from the model as it is generated.
+
+        The text is not normalized (passage limits, quote trimming, default disclaimer);
+        pass the joined deltas to finalize_content() for the canonical response.
+        """
+        oc = openai_client or self.client
+        if oc is None:
+            raise RuntimeError("OpenAI client not configured")
+
+        messages = self.build_messages(q, search_context=await self._get_search_context(q, oc))
+        stream = await create_chat_completion(
+            oc,
+            model=COMFORT_MODEL,
+            messages=messages,
+            response_format=json_schema_format(self.response_model),
+            prompt_cache_key=type(self).__name__,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            # Frees the connection and concurrency permit when the client disconnects mid-stream.
+            await stream.close()
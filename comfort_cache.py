@@ -0,0 +1,97 @@
+import hashlib
+import math
+from typing import Any, Awaitable, Callable
+
+import orjson
+from cachetools import TTLCache
+
+
+Embedder = Callable[[str], Awaitable[list[float]]]
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case so trivially different inputs share a cache key."""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model: str, messages: list[dict[str, str]], **extra: Any) -> str:
+    payload = {"model": model, "messages": messages, **extra}
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def openai_embedder(client: Any, model: str = "text-embedding-3-small") -> Embedder:
+    async def embed(text: str) -> list[float]:
+        result = await client.embeddings.create(model=model, input=text)
+        return list(result.data[0].embedding)
+
+    return embed
+
+
+def _cosine_similarity(left: list[float], right: list[float]) -> float:
+    dot = sum(a * b for a, b in zip(left, right))
+    norm = math.sqrt(sum(a * a for a in left)) * math.sqrt(sum(b * b for b in right))
+    return dot / norm if norm else 0.0
+
+
+class LLMCache:
+    """In-process cache for finished LLM responses.
+
+    Exact hits are looked up by a hash of the model and prompt messages. When an
+    embedder is configured, near-duplicate situations within the same scope are
+    also served from cache once their cosine similarity reaches the threshold.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        *,
+        embedder: Embedder | None = None,
+        similarity_threshold: float = 0.92,
+    ) -> None:
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._embedder = embedder
+        self._similarity_threshold = similarity_threshold
+        self._vectors: dict[str, list[tuple[list[float], str]]] = {}
+        self._pending_vectors: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str, *, text: str = "", scope: str = "") -> dict[str, Any] | None:
+        cached = self._entries.get(key)
+        if cached is not None:
+            return cached
+
+        vector = await self._embed(text)
+        if vector is None:
+            return None
+        # Remember the embedding so the following set() does not pay for it again.
+        self._pending_vectors[key] = vector
+        return self._nearest(scope, vector)
+
+    async def set(
+        self, key: str, value: dict[str, Any], *, text: str = "", scope: str = ""
+    ) -> None:
+        vector = self._pending_vectors.pop(key, None) or await self._embed(text)
+        self._entries[key] = value
+        if vector is not None:
+            self._vectors.setdefault(scope, []).append((vector, key))
+
+    async def _embed(self, text: str) -> list[float] | None:
+        if self._embedder is None or not text.strip():
+            return None
+        try:
+            return await self._embedder(text)
+        except Exception:
+            # Semantic matching is best effort; fall back to exact-match caching.
+            return None
+
+    def _nearest(self, scope: str, vector: list[float]) -> dict[str, Any] | None:
+        live = [(v, k) for v, k in self._vectors.get(scope, []) if k in self._entries]
+        self._vectors[scope] = live
+
+        best_key = None
+        best_score = self._similarity_threshold
+        for candidate, key in live:
+            score = _cosine_similarity(vector, candidate)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return self._entries.get(best_key) if best_key else None
@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import logging
+import os
+import random
+from typing import Any, Optional
+
+import httpx
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, RateLimitError
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+MAX_ATTEMPTS = 5
+
+# Caps in-flight OpenAI calls per worker so bursts queue here instead of exhausting the httpx pool.
+_semaphore = asyncio.Semaphore(int(os.getenv("OPENAI_MAX_CONCURRENCY", "32")))
+
+
+@functools.lru_cache(maxsize=1)
+def init_openai_client() -> Optional[AsyncOpenAI]:
+    """Initialize an async OpenAI client if API key is available; otherwise return None.
+    Avoids raising during module import so unit tests can run without network/keys.
+    Memoized: every service constructed without an explicit client shares this one, and
+    with it a single httpx pool sized for many concurrent slow LLM calls per worker.
+    With h2 installed, concurrent requests are multiplexed over HTTP/2 connections.
+    """
+    try:
+        return AsyncOpenAI(
+            http_client=httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=60.0),
+                timeout=httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", "60")), connect=5.0),
+            ),
+            # Retries are handled by create_chat_completion.
+            max_retries=0,
+        )
+    except Exception:
+        return None
+
+
+async def create_chat_completion(client: Any, **kwargs: Any) -> Any:
+    """Call chat.completions.create with bounded concurrency and jittered exponential backoff.
+
+    Only transient errors (rate limits, timeouts, connection failures, 5xx) are retried.
+    With stream=True the returned stream holds its concurrency permit until it is exhausted
+    or closed, since the connection stays busy until then.
+    """
+    if not kwargs.get("stream"):
+        async with _semaphore:
+            return await _create_with_retries(client, **kwargs)
+
+    await _semaphore.acquire()
+    try:
+        stream = await _create_with_retries(client, **kwargs)
+    except BaseException:
+        _semaphore.release()
+        raise
+    return _PermitStream(stream, _semaphore)
+
+
+async def _create_with_retries(client: Any, **kwargs: Any) -> Any:
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            resp = await client.chat.completions.create(**kwargs)
+            _log_prompt_cache_usage(resp)
+            return resp
+        except RETRYABLE_ERRORS:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(min(2**attempt, 30) + random.random())
+
+
+class _PermitStream:
+    """Wraps a streamed completion, returning its concurrency permit once it is exhausted, fails or is closed."""
+
+    def __init__(self, stream: Any, semaphore: asyncio.Semaphore) -> None:
+        self._stream = stream
+        self._semaphore = semaphore
+        self._released = False
+
+    def __aiter__(self) -> "_PermitStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._stream.__anext__()
+        except BaseException:  # StopAsyncIteration included
+            self._release()
+            raise
+
+    async def close(self) -> None:
+        self._release()
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            await close()
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._semaphore.release()
+
+    def __del__(self) -> None:
+        # Last resort for a stream abandoned without being closed.
+        self._release()
+
+
+def _log_prompt_cache_usage(resp: Any) -> None:
+    # Streams and fakes carry no usage; only complete responses report prompt caching.
+    usage = getattr(resp, "usage", None)
+    if usage is None or not usage.prompt_tokens:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    logger.info(
+        "Prompt cache: %d/%d prompt tokens cached (%.0f%%)",
+        cached,
+        usage.prompt_tokens,
+        100 * cached / usage.prompt_tokens,
+    )
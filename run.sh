@@ -0,0 +1,15 @@
+#!/usr/bin/env sh
+# Serve the API with async Uvicorn workers. Each worker's event loop already interleaves
+# many in-flight requests, and each one loads its own OpenAI client, caches and startup
+# warm-up, so a couple of workers is enough (nproc can report the host's cores inside a
+# container). Defaults to 2; set WEB_CONCURRENCY to override.
+set -e
+
+WORKERS="${WEB_CONCURRENCY:-2}"
+
+exec gunicorn app:app \
+    -k uvicorn.workers.UvicornWorker \
+    -w "$WORKERS" \
+    --bind "0.0.0.0:${PORT:-8000}" \
+    --keep-alive 75 \
+    --timeout 120
@@ -0,0 +1,176 @@
+"""On-disk cache for the chat completions made by the daily scripts.
+
+Re-running a script for the same day (after a failed commit step, or while iterating
+locally) sends byte-identical prompts; serving those from disk skips the API round trip
+and its cost. Entries are gzip'd ChatCompletion JSON, usage included, so token accounting
+still works on a hit. Set LLM_CACHE_DISABLE=1 to bypass the cache entirely.
+
+Cache misses also pass through a process-wide rate limiter (OPENAI_RPM requests per minute),
+so concurrent backfills and parallel jobs stay under the account's rate limit.
+"""
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+# Shared by every client the scripts build: a bounded timeout instead of the SDK's 10 minute
+# default, plus the SDK's jittered exponential backoff, which retries only timeouts, connection
+# errors, 429s and 5xx (never 400/401). Run with OPENAI_LOG=info to see each retry in the logs.
+CLIENT_OPTIONS = {"timeout": httpx.Timeout(60.0, connect=10.0), "max_retries": 4}
+
+
+
+@functools.lru_cache(maxsize=1)
+def get_openai_client():
+    """Process-wide sync client, so every call reuses one keep-alive connection pool."""
+    # Imported here: openai takes ~0.3s to import, which runs that exit early never need.
+    import openai
+
+    return openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), **CLIENT_OPTIONS)
+
+
+class RateLimiter:
+    """Leaky bucket allowing max_rate request starts per time_period, bursts included.
+
+    Slots are reserved under a thread lock, so one limiter serves sync callers, worker
+    threads and any number of event loops.
+    """
+
+    def __init__(self, max_rate, time_period=60.0):
+        self._interval = time_period / max_rate if max_rate > 0 else 0.0
+        self._period = time_period
+        self._lock = threading.Lock()
+        self._next_free = 0.0
+
+    def reserve(self):
+        """Claims the next slot and returns how many seconds to wait before using it."""
+        if not self._interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._next_free = max(self._next_free, now) + self._interval
+            return max(0.0, self._next_free - now - self._period)
+
+    def wait(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def async_wait(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# OPENAI_RPM=0 disables the limiter.
+RATE_LIMITER = RateLimiter(int(os.getenv("OPENAI_RPM", "50")))
+
+
+CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR", os.path.join(".cache", "openai")))
+
+
+def cache_key(**kwargs):
+    """Hash of the request parameters that determine the completion."""
+    payload = {k: kwargs.get(k) for k in ("model", "messages", "temperature", "max_tokens")}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _path_for(key, cache_dir):
+    return Path(cache_dir) / key[:2] / f"{key}.json.gz"
+
+
+def _load(key, ttl_seconds, cache_dir):
+    from openai.types.chat import ChatCompletion
+
+    path = _path_for(key, cache_dir)
+    try:
+        if time.time() - path.stat().st_mtime > ttl_seconds:
+            return None
+        with gzip.open(path, "rb") as f:
+            return ChatCompletion.model_validate_json(f.read())
+    except (OSError, ValueError):
+        # Missing, expired mid-read or corrupt entries are treated as misses.
+        return None
+
+
+def _store(key, response, cache_dir):
+    from openai.types.chat import ChatCompletion
+
+    # Only real API responses are cached; test doubles and streams pass through untouched.
+    if not isinstance(response, ChatCompletion):
+        return
+    path = _path_for(key, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with gzip.open(tmp_path, "wb") as f:
+        f.write(response.model_dump_json().encode("utf-8"))
+    os.replace(tmp_path, path)
+
+
+def _enabled(enabled):
+    return enabled and os.getenv("LLM_CACHE_DISABLE") != "1"
+
+
+def cached_chat_create(client, ttl_seconds, *, enabled=True, cache_dir=None, **kwargs):
+    """client.chat.completions.create(**kwargs), served from disk when an entry younger than ttl_seconds exists."""
+    if not _enabled(enabled):
+        RATE_LIMITER.wait()
+        return client.chat.completions.create(**kwargs)
+    cache_dir = cache_dir or CACHE_DIR
+    key = cache_key(**kwargs)
+    cached = _load(key, ttl_seconds, cache_dir)
+    if cached is not None:
+        return cached
+    RATE_LIMITER.wait()
+    response = client.chat.completions.create(**kwargs)
+    _store(key, response, cache_dir)
+    return response
+
+
+async def async_cached_chat_create(client, ttl_seconds, *, enabled=True, cache_dir=None, **kwargs):
+    """cached_chat_create for AsyncOpenAI clients."""
+    if not _enabled(enabled):
+        await RATE_LIMITER.async_wait()
+        return await client.chat.completions.create(**kwargs)
+    cache_dir = cache_dir or CACHE_DIR
+    key = cache_key(**kwargs)
+    cached = _load(key, ttl_seconds, cache_dir)
+    if cached is not None:
+        return cached
+    await RATE_LIMITER.async_wait()
+    response = await client.chat.completions.create(**kwargs)
+    _store(key, response, cache_dir)
+    return response
+
+
+async def async_cached_chat_stream(client, ttl_seconds, on_delta, *, enabled=True, cache_dir=None, **kwargs):
+    """async_cached_chat_create that streams, passing each content delta to on_delta as it arrives.
+
+    A cache hit delivers the whole cached content as a single delta.
+    """
+    use_cache = _enabled(enabled)
+    if use_cache:
+        cache_dir = cache_dir or CACHE_DIR
+        key = cache_key(**kwargs)
+        cached = _load(key, ttl_seconds, cache_dir)
+        if cached is not None:
+            on_delta(cached.choices[0].message.content or "")
+            return cached
+    await RATE_LIMITER.async_wait()
+    async with client.chat.completions.stream(**kwargs) as stream:
+        async for event in stream:
+            if event.type == "content.delta":
+                on_delta(event.delta)
+        response = await stream.get_final_completion()
+    if use_cache:
+        _store(key, response, cache_dir)
+    return response
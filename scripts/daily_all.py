@@ -0,0 +1,48 @@
+"""Generate today's devotional and good news digest in one process.
+
+The two jobs spend most of their time waiting on MCP servers and OpenAI, so running
+them side by side takes about as long as the slower one instead of both combined.
+"""
+
+import asyncio
+import datetime
+import os
+from zoneinfo import ZoneInfo
+
+import generate_devotional
+import good_news
+
+
+async def _run_devotional() -> None:
+    now_local = datetime.datetime.now(ZoneInfo("America/Los_Angeles"))
+    out_dir = generate_devotional.OUT_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    dates = generate_devotional.missing_dates(now_local.date(), 1, out_dir)
+    if not dates:
+        print("Today's devotional already exists. Skip writing.")
+        return
+    await generate_devotional.generate_days(dates, now_local, out_dir=out_dir)
+
+
+async def _run_good_news() -> None:
+    # The good news pipeline is synchronous (it drives its own MCP event loop), so it runs
+    # in a worker thread alongside the devotional's requests.
+    await asyncio.to_thread(good_news.main, [])
+
+
+async def main_async() -> None:
+    results = await asyncio.gather(_run_devotional(), _run_good_news(), return_exceptions=True)
+    for name, result in zip(("devotional", "good news"), results):
+        if isinstance(result, Exception):
+            print(f"Failed to generate {name}: {result}")
+
+
+def main() -> None:
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY is not set. Please set it in your .env file.")
+        return
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
+import argparse
+import asyncio
 import json
 import os
 import random
 import datetime
-import openai
+from itertools import accumulate
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
-from dateutil import tz
+
+from _llm_cache import CLIENT_OPTIONS, async_cached_chat_create, async_cached_chat_stream
+
+# openai itself is imported where a client is built, so --help and runs with nothing
+# left to generate skip its ~0.3s import.
 
 # Load environment variables from .env file
 load_dotenv()
@@ -134,11 +141,10 @@ THEME_CONFIG = {
     },
 }
 
-def weekday_bias(dt_local):
-    """Applies a light bias for weekdays vs. weekends."""
-    wd = dt_local.weekday()  # Mon=0 ... Sun=6
+def _bias(is_weekday):
+    """Light per-theme multipliers for weekdays vs. weekends."""
     bias = {}
-    if wd <= 4:  # Weekday
+    if is_weekday:
         bias["AI/Work Anxiety and Trust"] = 1.2
         bias["Time Management and Wisdom"] = 1.15
     else:  # Weekend
@@ -148,33 +154,57 @@ def weekday_bias(dt_local):
     bias["Morning Seeking and Quietness"] = 1.1
     return bias
 
-def pick_theme(dt_local):
-    """Picks a theme based on weights and biases."""
-    weights = {theme: cfg.get("weight", 1.0) for theme, cfg in THEME_CONFIG.items()}
-    for k, v in weekday_bias(dt_local).items():
-        weights[k] = weights.get(k, 1.0) * v
-    
-    items = list(weights.items())
-    total = sum(w for _, w in items)
-    r = random.uniform(0, total)
-    upto = 0.0
-    for theme, w in items:
-        if upto + w >= r:
-            return theme
-        upto += w
-    return items[-1][0]
-
-def pick_scriptures(theme):
+def weekday_bias(dt_local):
+    """Applies a light bias for weekdays vs. weekends."""
+    return _bias(dt_local.weekday() <= 4)  # Mon=0 ... Sun=6
+
+def _cum_weights(is_weekday):
+    bias = _bias(is_weekday)
+    return tuple(accumulate(cfg.get("weight", 1.0) * bias.get(theme, 1.0) for theme, cfg in THEME_CONFIG.items()))
+
+# Weights only depend on weekday vs. weekend, so both cumulative tables are built once.
+_THEMES = tuple(THEME_CONFIG)
+_WEEKDAY_CUM = _cum_weights(True)
+_WEEKEND_CUM = _cum_weights(False)
+
+def pick_theme(dt_local, rng=random):
+    """Picks a theme based on weights and biases; pass a seeded random.Random for reproducible picks."""
+    cum_weights = _WEEKDAY_CUM if dt_local.weekday() <= 4 else _WEEKEND_CUM
+    return rng.choices(_THEMES, cum_weights=cum_weights)[0]
+
+# Per-theme scripture tuples, resolved once instead of two dict lookups per pick.
+_THEME_SCRIPTURES = {theme: tuple(cfg.get("scriptures", ())) for theme, cfg in THEME_CONFIG.items()}
+_DEFAULT_SCRIPTURES = ("Psalm 23",)
+
+
+def pick_scriptures(theme, rng=random):
     """Picks 1 or 2 scripture references for the given theme."""
-    candidates = THEME_CONFIG.get(theme, {}).get("scriptures", [])
-    if not candidates:
-        return ["Psalm 23"]
-    k = 2 if len(candidates) > 1 and random.random() < 0.35 else 1
-    return random.sample(candidates, k)
-
-def generate_devotional_with_ai(theme, refs, dt_local):
-    """Generates devotional content using OpenAI API."""
-    
+    candidates = _THEME_SCRIPTURES.get(theme) or _DEFAULT_SCRIPTURES
+    k = 2 if len(candidates) > 1 and rng.random() < 0.35 else 1
+    return rng.sample(candidates, k)
+
+DEVOTIONAL_MODEL = "gpt-4o"
+# Same-day re-runs reuse the day's completion instead of paying for a new one.
+DEVOTIONAL_CACHE_TTL = 24 * 60 * 60
+# Everything that does not change day to day lives in the system message, so each run
+# shares a byte-identical prefix (OpenAI prompt caching); the user turn holds only the day's values.
+SYSTEM_PROMPT = """You are a wise and compassionate Chinese theologian and pastor.
+Generate a daily devotional in Markdown format, all the text must using Simplified Chinese.
+
+Please provide the following sections in your response:
+1.  **Full Scripture Text**: Provide the full text for the scripture reference(s) given. Use a well-regarded English translation (like NIV or ESV).
+2.  **Interpretation**: Explain the meaning and context of these verses. What is the main message?
+3.  **Application**: How can I apply this to my daily life? Make it practical and connect it to today's theme.
+4.  **Prayer**: Write a short, heartfelt prayer based on the scripture and application.
+
+Structure the output clearly with Markdown headings.
+"""
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def build_devotional_messages(theme, refs, dt_local):
+    """Builds the chat messages for one day's devotional."""
+
     scripture_references = ", ".join(refs)
     theme_prayer_focus = THEME_CONFIG.get(theme, {}).get("prayer_focus")
     prayer_focus_instructions = ""
@@ -183,79 +213,160 @@ def generate_devotional_with_ai(theme, refs, dt_local):
             "\nPrayer section must explicitly include this theme-specific focus:\n"
             f"{theme_prayer_focus}\n"
         )
-    
-    prompt = f"""
-You are a wise and compassionate Chinese theologian and pastor. 
-Generate a daily devotional in Markdown format, all the text must using Simplified Chinese.
 
-Today's Date: {dt_local.strftime('%Y-%m-%d')}
+    prompt = f"""Today's Date: {dt_local.strftime('%Y-%m-%d')}
 Theme: {theme}
 Scripture References: {scripture_references}
+{prayer_focus_instructions}"""
+    return [
+        _SYSTEM_MESSAGE,
+        {"role": "user", "content": prompt}
+    ]
 
-Please provide the following sections in your response:
-1.  **Full Scripture Text**: Provide the full text for the scripture reference(s) above. Use a well-regarded English translation (like NIV or ESV).
-2.  **Interpretation**: Explain the meaning and context of these verses. What is the main message?
-3.  **Application**: How can I apply this to my daily life? Make it practical and connect it to the theme of '{theme}'.
-4.  **Prayer**: Write a short, heartfelt prayer based on the scripture and application.
-{prayer_focus_instructions}
+async def generate_devotional_with_ai(theme, refs, dt_local, client=None, on_delta=None):
+    """Generates devotional content using OpenAI API.
 
-Structure the output clearly with Markdown headings.
-"""
+    With on_delta, the reply is streamed and each piece of text is passed to it as it arrives.
+    """
 
     try:
-        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a wise and compassionate theologian and pastor."},
-                {"role": "user", "content": prompt}
-            ],
+        if client is None:
+            import openai
+
+            client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), **CLIENT_OPTIONS)
+        request = dict(
+            model=DEVOTIONAL_MODEL,
+            messages=build_devotional_messages(theme, refs, dt_local),
             temperature=0.7,
             max_tokens=1024,
         )
+        if on_delta is None:
+            response = await async_cached_chat_create(client, DEVOTIONAL_CACHE_TTL, **request)
+        else:
+            response = await async_cached_chat_stream(client, DEVOTIONAL_CACHE_TTL, on_delta, **request)
         return response.choices[0].message.content
     except Exception as e:
         print(f"Error calling OpenAI API: {e}")
         return f"**Error**: Could not generate devotional content due to an API error.\n\n**Theme**: {theme}\n**Scriptures**: {', '.join(refs)}"
 
+def devotional_header(date_str):
+    return f"# Daily Scripture and Devotion · {date_str}\n\n"
+
+
+def devotional_footer(generated_at):
+    return f"\n\n_Generated on: {generated_at.strftime('%Y-%m-%d %H:%M %Z')}_\n"
+
+
+def render_devotional(date_str, body, generated_at):
+    """Wraps the generated body with the daily title and generation timestamp."""
+    return f"{devotional_header(date_str)}{body}{devotional_footer(generated_at)}"
+
+
+async def stream_devotional_to_file(client, theme, refs, dt_local, date_str, out_path, generated_at):
+    """Streams the devotional into <out_path>.partial as it is generated, then moves it into place.
+
+    A run killed mid-generation leaves the text received so far in the .partial file,
+    and never a truncated <out_path>.
+    """
+    partial_path = f"{out_path}.partial"
+    header = devotional_header(date_str).encode("utf-8")
+    streamed = []
+    pending = []
+    with open(partial_path, "wb") as f:
+        f.write(header)
+
+        def write_pending():
+            f.write("".join(pending).encode("utf-8"))
+            f.flush()
+            pending.clear()
+
+        def on_delta(delta):
+            streamed.append(delta)
+            pending.append(delta)
+            # One write per completed line instead of per token keeps the event loop (shared with
+            # the other days and jobs) from stalling on file I/O.
+            if "\n" in delta:
+                write_pending()
+
+        body = await generate_devotional_with_ai(theme, refs, dt_local, client, on_delta=on_delta)
+        if "".join(streamed) != body:
+            # The API call failed part-way: replace whatever streamed with the error body.
+            f.seek(len(header))
+            f.truncate()
+            f.write(body.encode("utf-8"))
+        else:
+            write_pending()
+        f.write(devotional_footer(generated_at).encode("utf-8"))
+    os.replace(partial_path, out_path)
+
+
+def write_atomic(out_path, content):
+    """Writes content via a sibling temp file and os.replace, so a crash or concurrent run never leaves a partial file."""
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content.encode("utf-8"))
+    os.replace(tmp_path, out_path)
+
+
+OUT_DIR = "daily"
+
+
+def missing_dates(today, days, out_dir=OUT_DIR):
+    """Returns the dates in the last `days` days (including today) without a devotional file."""
+    dates = [today - datetime.timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    return [d for d in dates if not os.path.exists(os.path.join(out_dir, f"{d.isoformat()}.md"))]
+
+
+async def generate_days(dates, now_local, concurrency=10, out_dir=OUT_DIR):
+    """Generates and writes one devotional per date, with at most `concurrency` OpenAI calls in flight."""
+    import openai
+
+    client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), **CLIENT_OPTIONS)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate_one(day):
+        # Past days are dated at 6am local, the time the daily workflow would have run.
+        dt_local = now_local if day == now_local.date() else datetime.datetime.combine(
+            day, datetime.time(6, 0), tzinfo=now_local.tzinfo
+        )
+        theme = pick_theme(dt_local)
+        refs = pick_scriptures(theme)
+        date_str = day.isoformat()
+        print(f"Generating devotional for {date_str} with theme '{theme}' and scriptures '{', '.join(refs)}'...")
+        out_path = os.path.join(out_dir, f"{date_str}.md")
+        async with semaphore:
+            await stream_devotional_to_file(client, theme, refs, dt_local, date_str, out_path, now_local)
+        print(f"Successfully wrote devotional to {out_path}")
+
+    try:
+        await asyncio.gather(*(generate_one(day) for day in dates))
+    finally:
+        await client.close()
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate today's devotional, optionally filling in missed days.")
+    parser.add_argument("--days", type=int, default=1, help="How many days back (including today) to fill in.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum OpenAI requests in flight.")
+    args = parser.parse_args()
+
     # Set timezone to America/Los_Angeles to align with "morning devotion"
-    la_tz = tz.gettz("America/Los_Angeles")
-    now_utc = datetime.datetime.utcnow().replace(tzinfo=tz.UTC)
-    now_local = now_utc.astimezone(la_tz)
+    now_local = datetime.datetime.now(ZoneInfo("America/Los_Angeles"))
 
     # Check for OpenAI API key
     if not os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY") == "YOUR_OPENAI_API_KEY":
         print("Error: OPENAI_API_KEY is not set. Please set it in your .env file.")
         return
 
-    theme = pick_theme(now_local)
-    refs = pick_scriptures(theme)
+    os.makedirs(OUT_DIR, exist_ok=True)
 
-    # --- Output File Setup ---
-    out_dir = "daily"
-    os.makedirs(out_dir, exist_ok=True)
-    date_str = now_local.strftime("%Y-%m-%d")
-    out_path = os.path.join(out_dir, f"{date_str}.md")
-
-    # If file already exists, don't regenerate to avoid duplicate commits
-    if os.path.exists(out_path):
-        print(f"{out_path} already exists. Skip writing.")
+    # Days whose file already exists are not regenerated, to avoid duplicate commits
+    dates = missing_dates(now_local.date(), args.days)
+    if not dates:
+        print(f"Devotionals for the last {args.days} day(s) already exist. Skip writing.")
         return
 
-    print(f"Generating devotional for {date_str} with theme '{theme}' and scriptures '{', '.join(refs)}'...")
-    
-    # --- Generate Content ---
-    title = f"# Daily Scripture and Devotion · {date_str}"
-    body = generate_devotional_with_ai(theme, refs, now_local)
-    generation_time = f"\n_Generated on: {now_local.strftime('%Y-%m-%d %H:%M %Z')}_"
-    content = f"{title}\n\n{body}\n{generation_time}\n"
-
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(content)
-
-    print(f"Successfully wrote devotional to {out_path}")
+    asyncio.run(generate_days(dates, now_local, args.concurrency))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+import argparse
+import datetime
+import io
+import json
+import os
+import random
+import time
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+
+from _llm_cache import get_openai_client
+from generate_devotional import (
+    DEVOTIONAL_MODEL,
+    OUT_DIR,
+    build_devotional_messages,
+    missing_dates,
+    pick_scriptures,
+    pick_theme,
+    render_devotional,
+    write_atomic,
+)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Backfills missed days through the OpenAI Batch API: half the cost of synchronous
+# calls and a separate rate limit, at the price of results arriving within 24h.
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def parse_backfill_range(value):
+    """Parses "YYYY-MM-DD..YYYY-MM-DD" (inclusive; a single date also works) into its dates."""
+    start_text, sep, end_text = value.partition("..")
+    try:
+        start = datetime.date.fromisoformat(start_text)
+        end = datetime.date.fromisoformat(end_text) if sep else start
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD..YYYY-MM-DD, got {value!r}")
+    if end < start:
+        raise argparse.ArgumentTypeError(f"range end {end} is before its start {start}")
+    return [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def build_batch_lines(dates, la_tz):
+    """Builds one /v1/chat/completions batch request per date, keyed by the ISO date."""
+    lines = []
+    for d in dates:
+        dt_local = datetime.datetime.combine(d, datetime.time(6, 0), tzinfo=la_tz)
+        # Seeded by the date, so resubmitting a range asks for the same themes and passages.
+        rng = random.Random(d.toordinal())
+        theme = pick_theme(dt_local, rng)
+        refs = pick_scriptures(theme, rng)
+        lines.append(
+            json.dumps(
+                {
+                    "custom_id": d.isoformat(),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": DEVOTIONAL_MODEL,
+                        "messages": build_devotional_messages(theme, refs, dt_local),
+                        "temperature": 0.7,
+                        "max_tokens": 1024,
+                    },
+                },
+                ensure_ascii=False,
+            )
+        )
+    return lines
+
+
+def write_batch_output(output_text, generated_at, out_dir=OUT_DIR):
+    """Writes one markdown file per successful batch result; returns the paths written."""
+    written = []
+    for line in output_text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        date_str = row["custom_id"]
+        try:
+            body = row["response"]["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            print(f"Skipping {date_str}: {row.get('error') or 'no content in batch result'}")
+            continue
+        out_path = os.path.join(out_dir, f"{date_str}.md")
+        write_atomic(out_path, render_devotional(date_str, body, generated_at))
+        written.append(out_path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill missing daily devotionals via the OpenAI Batch API.")
+    parser.add_argument("--days", type=int, default=7, help="How many days back to look for missing devotionals.")
+    parser.add_argument(
+        "--backfill",
+        type=parse_backfill_range,
+        metavar="START..END",
+        help="Explicit inclusive date range to fill in instead of the last --days days.",
+    )
+    parser.add_argument("--poll-interval", type=int, default=60, help="Seconds between batch status checks.")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY") == "YOUR_OPENAI_API_KEY":
+        print("Error: OPENAI_API_KEY is not set. Please set it in your .env file.")
+        return
+
+    la_tz = ZoneInfo("America/Los_Angeles")
+    today = datetime.datetime.now(la_tz).date()
+    os.makedirs(OUT_DIR, exist_ok=True)
+    if args.backfill:
+        dates = [d for d in args.backfill if not os.path.exists(os.path.join(OUT_DIR, f"{d.isoformat()}.md"))]
+    else:
+        dates = missing_dates(today, args.days)
+    if not dates:
+        print("No missing devotionals in the requested range.")
+        return
+
+    client = get_openai_client()
+    payload = "\n".join(build_batch_lines(dates, la_tz)).encode("utf-8")
+    batch_file = client.files.create(file=("devotional_batch.jsonl", io.BytesIO(payload)), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"Submitted batch {batch.id} for {', '.join(d.isoformat() for d in dates)}")
+
+    while batch.status not in TERMINAL_STATUSES:
+        time.sleep(args.poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        print(f"Batch {batch.id}: {batch.status}")
+
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"Batch {batch.id} ended with status '{batch.status}'; nothing written.")
+        return
+
+    output = client.files.content(batch.output_file_id)
+    generated_at = datetime.datetime.now(la_tz)
+    for path in write_batch_output(output.text, generated_at):
+        print(f"Successfully wrote devotional to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,36 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
+import functools
+import hashlib
 import json
 import os
 import re
 import shlex
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 from dataclasses import asdict, dataclass, replace
-from datetime import datetime
+from datetime import datetime, timezone
+from itertools import chain
 from pathlib import Path
-from typing import Protocol, Sequence, Tuple
+from typing import TYPE_CHECKING, AsyncIterator, Protocol, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 try:
-    import mcp.types as types
-    from mcp.client.session import ClientSession
-    from mcp.client.stdio import StdioServerParameters, stdio_client
-except ImportError as exc:
-    raise ImportError(
-        "The 'mcp' package is required. Install it before running this script."
-    ) from exc
-
-import openai
-from dateutil import tz
+    import tiktoken
+except ImportError:  # Optional: without it, excerpts are cut by characters.
+    tiktoken = None
+
 from dotenv import load_dotenv
 
+from _llm_cache import cached_chat_create, get_openai_client
+
+if TYPE_CHECKING:
+    # mcp and openai take ~0.8s to import together, so runs that exit early never load them.
+    import openai
+    from mcp.client.session import ClientSession
+
 load_dotenv()
 
 
@@ -59,6 +67,19 @@ class GoodNewsConfig:
     fetch_server_args: Tuple[str, ...]
     fetch_max_chars: int
     fetch_article_limit: int
+    llm_cache_enabled: bool = True
+    fetch_concurrency: int = 4
+    # Where fetched article text is cached between runs; None disables the cache.
+    fetch_cache_dir: Path | None = None
+    # Upper bounds for a single MCP tool call, so a stuck server cannot hang the cron run.
+    search_timeout: float = 30.0
+    fetch_timeout: float = 20.0
+
+
+# Re-runs within a few hours reuse the summary; news moves faster than devotionals.
+SUMMARY_CACHE_TTL = 6 * 60 * 60
+# The same story often resurfaces in the next day's search, so page text is kept a bit longer.
+FETCH_CACHE_TTL = 12 * 60 * 60
 
 
 @dataclass(frozen=True)
@@ -102,42 +123,102 @@ def resolve_news_server_args(template: str, server_dir: Path | None) -> Tuple[st
     return tuple(shlex.split(formatted))
 
 
+# GoodNewsFetcher._compose_feed starts every article block with this, so its feeds split
+# with plain str.split; the regex handles hand-written "Article N:" feeds.
+_FEED_ARTICLE_SEP = "\n\nArticle "
+_BLOCK_SPLIT_RE = re.compile(r"Article \d+:\s*")
+# The "Article " / "N:" left at the head of a block after splitting on _FEED_ARTICLE_SEP.
+_BLOCK_NUMBER_RE = re.compile(r"(?:Article )?\d+(?::|\s*\n)\s*")
+# Numbered result headings ("1. Title") in the DuckDuckGo MCP search report.
+_DDG_RESULT_RE = re.compile(r"^(\d+)\.\s*(.+)$")
+
+_ARTICLE_FIELDS = frozenset({"Title", "URL", "Source", "Author", "Published", "Summary", "Description"})
+_CONTENT_FIELD = "Full Text Excerpt"
+
+
+# One C-level scan finds every known "Key: value" line; excerpt text is never split into lines.
+_FIELD_LINE_RE = re.compile(
+    r"^(%s):(.*)$" % "|".join(map(re.escape, sorted(_ARTICLE_FIELDS | {_CONTENT_FIELD}))),
+    re.MULTILINE,
+)
+
+
+def _parse_article_fields(block: str) -> Tuple[dict[str, str], str | None]:
+    """One pass over the block's "Key: value" lines; everything after the excerpt key is content."""
+    fields: dict[str, str] = {}
+    for match in _FIELD_LINE_RE.finditer(block):
+        key, value = match.groups()
+        if key == _CONTENT_FIELD:
+            content = (value + block[match.end() :]).strip()
+            return fields, content or None
+        value = value.strip()
+        if value:
+            # First occurrence wins, as with a top-down search.
+            fields.setdefault(key, value)
+    return fields, None
+
+
 def parse_articles(raw_feed: str) -> Tuple[Article, ...]:
     if not raw_feed.strip():
         return tuple()
 
-    blocks = [block for block in re.split(r"Article \d+:\s*", raw_feed) if block.strip()]
+    if _FEED_ARTICLE_SEP in raw_feed:
+        blocks = raw_feed.split(_FEED_ARTICLE_SEP)
+        if not blocks[0].startswith("Article "):
+            # The search report preface, not an article.
+            blocks = blocks[1:]
+    else:
+        blocks = _BLOCK_SPLIT_RE.split(raw_feed)
 
     parsed: list[Article] = []
     for block in blocks:
-        title_match = re.search(r"^Title:\s*(.+)$", block, re.MULTILINE)
-        url_match = re.search(r"^URL:\s*(.+)$", block, re.MULTILINE)
-        source_match = re.search(r"^Source:\s*(.+)$", block, re.MULTILINE)
-        author_match = re.search(r"^Author:\s*(.+)$", block, re.MULTILINE)
-        published_match = re.search(r"^Published:\s*(.+)$", block, re.MULTILINE)
-        summary_match = re.search(r"^Summary:\s*(.+)$", block, re.MULTILINE)
-        if not summary_match:
-            summary_match = re.search(r"^Description:\s*(.+)$", block, re.MULTILINE)
-        content_match = re.search(r"^Full Text Excerpt:\s*(.+)$", block, re.MULTILINE | re.DOTALL)
-
-        if not title_match and not url_match:
+        if not block.strip():
+            continue
+        # Inline feeds ("Article 2: Title: X") would otherwise hide the first field after the number.
+        number = _BLOCK_NUMBER_RE.match(block)
+        if number:
+            block = block[number.end() :]
+        fields, content = _parse_article_fields(block)
+        if "Title" not in fields and "URL" not in fields:
             continue
 
         parsed.append(
             Article(
-                title=title_match.group(1).strip() if title_match else "未命名",
-                source=source_match.group(1).strip() if source_match else None,
-                author=author_match.group(1).strip() if author_match else None,
-                published_at=published_match.group(1).strip() if published_match else None,
-                url=url_match.group(1).strip() if url_match else None,
-                description=summary_match.group(1).strip() if summary_match else None,
-                content=content_match.group(1).strip() if content_match else None,
+                title=fields.get("Title", "未命名"),
+                source=fields.get("Source"),
+                author=fields.get("Author"),
+                published_at=fields.get("Published"),
+                url=fields.get("URL"),
+                description=fields.get("Summary") or fields.get("Description"),
+                content=content,
             )
         )
 
     return tuple(parsed)
 
 
+def _format_prompt_article(index: int, article: Article) -> str:
+    return (
+        f"Article {index}\n"
+        f"Title: {article.title}\n"
+        f"Source: {article.source or '(unknown source)'}\n"
+        f"Author: {article.author or '(unknown author)'}\n"
+        f"Published: {article.published_at or '(unknown time)'}\n"
+        f"URL: {article.url or '(no URL)'}\n"
+        f"Summary: {article.description or '(no summary provided)'}\n"
+        f"Full Text Excerpt:\n{article.content or '(no content fetched)'}"
+    )
+
+
+def _format_source_line(index: int, article: Article) -> str:
+    suffix_text = " ".join(
+        part for part in (article.source, f"({article.published_at})" if article.published_at else None) if part
+    )
+    if article.url:
+        return f"{index}. [{article.title}]({article.url}) {suffix_text}".rstrip()
+    return f"{index}. {article.title} {suffix_text}".rstrip()
+
+
 def build_report(
     summary_body: str,
     articles: Sequence[Article],
@@ -149,17 +230,7 @@ def build_report(
 
     lines.append("## 信息来源")
     if articles:
-        for index, article in enumerate(articles, 1):
-            suffix = []
-            if article.source:
-                suffix.append(article.source)
-            if article.published_at:
-                suffix.append(f"({article.published_at})")
-            suffix_text = " ".join(suffix)
-            if article.url:
-                lines.append(f"{index}. [{article.title}]({article.url}) {suffix_text}".rstrip())
-            else:
-                lines.append(f"{index}. {article.title} {suffix_text}".rstrip())
+        lines.extend(_format_source_line(index, article) for index, article in enumerate(articles, 1))
     else:
         lines.append("暂无可引用的文章链接。")
 
@@ -174,6 +245,38 @@ def build_report(
     return "\n".join(lines)
 
 
+@functools.lru_cache(maxsize=None)
+def _token_encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Encodings are downloaded on first use; when that fails, cut by characters instead.
+        return None
+
+
+def truncate_excerpt(text: str, max_chars: int, model: str) -> str:
+    """Bound an article excerpt before it reaches the summarizer prompt.
+
+    With tiktoken the cut is on token boundaries (about max_chars // 3 tokens), so the
+    prompt cost is bounded directly; otherwise it falls back to max_chars characters.
+    """
+    encoding = _token_encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        budget = max(1, max_chars // 3)
+        if len(tokens) <= budget:
+            return text
+        return encoding.decode(tokens[:budget]) + "..."
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "..."
+
+
 class GoodNewsFetcher:
     def __init__(self, config: GoodNewsConfig) -> None:
         self._config = config
@@ -189,7 +292,7 @@ class GoodNewsFetcher:
             if not stripped:
                 continue
 
-            match = re.match(r"^(\d+)\.\s*(.+)$", stripped)
+            match = _DDG_RESULT_RE.match(stripped)
             if match:
                 if current_title or current_url or current_summary:
                     articles.append(
@@ -223,150 +326,308 @@ class GoodNewsFetcher:
 
         return articles
 
+    @staticmethod
+    def _format_feed_article(idx: int, article: Article) -> str:
+        parts = [f"Article {idx}"]
+        if article.title:
+            parts.append(f"Title: {article.title}")
+        if article.url:
+            parts.append(f"URL: {article.url}")
+        if article.description:
+            parts.append(f"Summary: {article.description}")
+        if article.content:
+            parts.append("Full Text Excerpt:")
+            parts.append(article.content)
+        return "\n".join(parts)
+
     def _compose_feed(
         self, search_report: str, articles: Sequence[Article]
     ) -> str:
         if not articles:
             return search_report
 
-        sections: list[str] = [search_report]
-        for idx, article in enumerate(articles, 1):
-            body_lines = [f"Article {idx}"]
-            if article.title:
-                body_lines.append(f"Title: {article.title}")
-            if article.url:
-                body_lines.append(f"URL: {article.url}")
-            if article.description:
-                body_lines.append(f"Summary: {article.description}")
-            if article.content:
-                body_lines.append("Full Text Excerpt:")
-                body_lines.append(article.content)
-            sections.append("\n".join(body_lines))
-
-        return "\n\n".join(sections)
+        return "\n\n".join(
+            chain((search_report,), (self._format_feed_article(idx, article) for idx, article in enumerate(articles, 1)))
+        )
+
+    @asynccontextmanager
+    async def _mcp_session(
+        self, command: str, args: Sequence[str], server_dir: Path | None
+    ) -> AsyncIterator[ClientSession]:
+        """Spawn an MCP stdio server and yield its (not yet initialized) session."""
+        try:
+            from mcp.client.session import ClientSession
+            from mcp.client.stdio import StdioServerParameters, stdio_client
+        except ImportError as exc:
+            raise ImportError(
+                "The 'mcp' package is required. Install it before running this script."
+            ) from exc
 
-    async def _fetch_async(self) -> FetchResult:
         server_params = StdioServerParameters(
-            command=self._config.ddg_server_cmd,
-            args=list(self._config.ddg_server_args),
-            cwd=str(self._config.ddg_server_dir) if self._config.ddg_server_dir else None,
+            command=command,
+            args=list(args),
+            cwd=str(server_dir) if server_dir else None,
         )
-
         async with stdio_client(server_params) as (read_stream, write_stream):
             async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
+                yield session
+
+    def _fetch_server_configured(self) -> bool:
+        return (
+            self._config.fetch_article_limit > 0
+            and bool(self._config.fetch_server_cmd)
+            and bool(self._config.fetch_server_args)
+        )
+
+    async def _enter_fetch_session(self, stack: AsyncExitStack) -> ClientSession | None:
+        # Entered in the caller's task: stdio_client holds an anyio cancel scope, which must be
+        # exited by the same task that entered it when the stack unwinds.
+        if not self._fetch_server_configured():
+            return None
+        try:
+            return await stack.enter_async_context(
+                self._mcp_session(
+                    self._config.fetch_server_cmd,
+                    self._config.fetch_server_args,
+                    self._config.fetch_server_dir,
+                )
+            )
+        except Exception:
+            # Enrichment is best effort; the digest still works from search summaries.
+            return None
+
+    async def _initialize_fetch_session(self, session: ClientSession) -> ClientSession | None:
+        try:
+            await session.initialize()
+            return session
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return None
+
+    async def _search(self, session: ClientSession) -> Tuple[str, list[Article]]:
+        from mcp.types import TextContent
+
+        await session.initialize()
 
-                result = await session.call_tool(
+        try:
+            result = await asyncio.wait_for(
+                session.call_tool(
                     "search",
                     {
                         "query": self._config.query,
                         "max_results": self._config.ddg_max_results,
                     },
+                ),
+                timeout=self._config.search_timeout,
+            )
+        except asyncio.TimeoutError:
+            raise RuntimeError(
+                f"DuckDuckGo MCP search timed out after {self._config.search_timeout:g}s."
+            ) from None
+
+        if result.isError:
+            message = (
+                "\n".join(
+                    item.text
+                    for item in result.content
+                    if isinstance(item, TextContent)
                 )
+                or "Unknown MCP error"
+            )
+            raise RuntimeError(f"MCP server reported an error: {message}")
 
-                if result.isError:
-                    message = (
-                        "\n".join(
-                            item.text
-                            for item in result.content
-                            if isinstance(item, types.TextContent)
-                        )
-                        or "Unknown MCP error"
-                    )
-                    raise RuntimeError(f"MCP server reported an error: {message}")
+        search_report_parts: list[str] = []
+        for item in result.content:
+            if isinstance(item, TextContent) and item.text.strip():
+                search_report_parts.append(item.text.strip())
 
-                search_report_parts: list[str] = []
-                for item in result.content:
-                    if isinstance(item, types.TextContent) and item.text.strip():
-                        search_report_parts.append(item.text.strip())
+        search_report = "\n".join(search_report_parts)
+        articles = self._parse_ddg_results(search_report)
+        if not articles:
+            raise RuntimeError("DuckDuckGo search returned no parseable results.")
+        return search_report, articles
 
-                search_report = "\n".join(search_report_parts)
-                articles = self._parse_ddg_results(search_report)
-                if not articles:
-                    raise RuntimeError("DuckDuckGo search returned no parseable results.")
+    async def _fetch_async(self) -> FetchResult:
+        async with AsyncExitStack() as stack:
+            session = await stack.enter_async_context(
+                self._mcp_session(
+                    self._config.ddg_server_cmd,
+                    self._config.ddg_server_args,
+                    self._config.ddg_server_dir,
+                )
+            )
+            fetch_session = await self._enter_fetch_session(stack)
+            # Only the handshake runs in its own task: the fetch server initializes while the
+            # search runs, hiding its cold start.
+            fetch_ready = (
+                asyncio.ensure_future(self._initialize_fetch_session(fetch_session))
+                if fetch_session is not None
+                else None
+            )
+            try:
+                search_report, articles = await self._search(session)
+                fetch_session = await fetch_ready if fetch_ready is not None else None
+            except BaseException:
+                if fetch_ready is not None:
+                    fetch_ready.cancel()
+                    await asyncio.gather(fetch_ready, return_exceptions=True)
+                raise
+
+            try:
+                enriched_articles = await self._enrich_articles_with_content(
+                    articles, fetch_session=fetch_session
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                enriched_articles = articles
+
+            augmented_feed = self._compose_feed(search_report, enriched_articles)
+            return FetchResult(augmented_feed, tuple(), tuple(enriched_articles))
 
+    async def _fetch_pages(self, session: ClientSession, urls: Sequence[str]) -> dict[str, str]:
+        from mcp.types import TextContent
+
+        # ClientSession multiplexes requests by id, so fetches can be in flight together.
+        semaphore = asyncio.Semaphore(max(1, self._config.fetch_concurrency))
+
+        async def fetch_one(url: str) -> Tuple[str, str | None]:
+            async with semaphore:
                 try:
-                    enriched_articles = await self._enrich_articles_with_content(articles)
+                    result = await asyncio.wait_for(
+                        session.call_tool(
+                            "fetch",
+                            {"url": url, "max_length": self._config.fetch_max_chars},
+                        ),
+                        timeout=self._config.fetch_timeout,
+                    )
                 except asyncio.CancelledError:
                     raise
                 except Exception:
-                    enriched_articles = articles
+                    return url, None
 
-                augmented_feed = self._compose_feed(search_report, enriched_articles)
-                return FetchResult(augmented_feed, tuple(), tuple(enriched_articles))
+            if result.isError:
+                return url, None
+
+            collected = [
+                item.text
+                for item in result.content
+                if isinstance(item, TextContent) and item.text.strip()
+            ]
+            return url, "\n".join(collected) if collected else None
+
+        results = await asyncio.gather(*(fetch_one(url) for url in urls))
+        return {url: content for url, content in results if content is not None}
 
     async def _enrich_articles_with_content(
-        self, articles: Sequence[Article]
+        self, articles: Sequence[Article], fetch_session: ClientSession | None = None
     ) -> Tuple[Article, ...]:
         if not articles:
             return tuple()
 
-        urls: list[str] = []
-        for article in articles:
-            if article.url and article.url not in urls:
-                urls.append(article.url)
+        urls = list(dict.fromkeys(article.url for article in articles if article.url))
 
         if not urls:
             return tuple(articles)
 
-        if self._config.fetch_article_limit <= 0:
-            return tuple(articles)
-
-        if not self._config.fetch_server_cmd or not self._config.fetch_server_args:
+        if not self._fetch_server_configured():
             return tuple(articles)
 
         urls = urls[: self._config.fetch_article_limit]
 
-        server_params = StdioServerParameters(
-            command=self._config.fetch_server_cmd,
-            args=list(self._config.fetch_server_args),
-            cwd=str(self._config.fetch_server_dir) if self._config.fetch_server_dir else None,
-        )
-
+        # Pages fetched on a recent run are read from disk; the MCP fetch server (and its
+        # uvx cold start) is only launched for the rest.
         contents: dict[str, str] = {}
-        try:
-            async with stdio_client(server_params) as (read_stream, write_stream):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    for url in urls:
-                        try:
-                            result = await session.call_tool(
-                                "fetch",
-                                {"url": url, "max_length": self._config.fetch_max_chars},
-                            )
-                        except asyncio.CancelledError:
-                            raise
-                        except Exception:
-                            continue
-
-                        if result.isError:
-                            continue
-
-                        collected = [
-                            item.text
-                            for item in result.content
-                            if isinstance(item, types.TextContent) and item.text.strip()
-                        ]
-                        if collected:
-                            contents[url] = "\n".join(collected)
-        except asyncio.CancelledError:
-            raise
-        except Exception:
-            return tuple(articles)
+        to_fetch: list[str] = []
+        for url in urls:
+            cached = self._load_cached_page(url)
+            if cached is None:
+                to_fetch.append(url)
+            else:
+                contents[url] = cached
+
+        if to_fetch:
+            try:
+                if fetch_session is not None:
+                    fetched = await self._fetch_pages(fetch_session, to_fetch)
+                else:
+                    async with AsyncExitStack() as stack:
+                        session = await self._enter_fetch_session(stack)
+                        if session is not None:
+                            session = await self._initialize_fetch_session(session)
+                        fetched = await self._fetch_pages(session, to_fetch) if session is not None else {}
+                for url, content in fetched.items():
+                    contents[url] = content
+                    self._store_cached_page(url, content)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Keep whatever came from the cache.
+                pass
 
         enriched: list[Article] = []
         for article in articles:
             if article.url and article.url in contents:
-                enriched.append(replace(article, content=contents[article.url]))
+                # Truncated once here, so the summarizer (and any retry of it) uses the bounded text as-is.
+                content = truncate_excerpt(contents[article.url], self._config.fetch_max_chars, self._config.model)
+                enriched.append(replace(article, content=content))
             else:
                 enriched.append(article)
 
         return tuple(enriched)
 
+    def _page_cache_path(self, url: str) -> Path | None:
+        if self._config.fetch_cache_dir is None:
+            return None
+        key = hashlib.sha256(f"{url}\n{self._config.fetch_max_chars}".encode("utf-8")).hexdigest()
+        return self._config.fetch_cache_dir / f"{key}.txt"
+
+    def _load_cached_page(self, url: str) -> str | None:
+        path = self._page_cache_path(url)
+        if path is None:
+            return None
+        try:
+            if time.time() - path.stat().st_mtime > FETCH_CACHE_TTL:
+                return None
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def _store_cached_page(self, url: str, text: str) -> None:
+        path = self._page_cache_path(url)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+
     def fetch(self) -> FetchResult:
         return asyncio.run(self._fetch_async())
 
 
+# The instructions never change, so they live in the system message and every run shares a
+# byte-identical prefix (OpenAI prompt caching); the user turn carries only the day's articles.
+SUMMARY_SYSTEM_PROMPT = """You are an upbeat journalist who only writes truthful, uplifting reports in Simplified Chinese. Always ground your writing in the provided article content.
+
+用户会提供若干正面新闻的原文内容。请严格依据 Full Text Excerpt（若存在）撰写总结，如若全文不可用，可参考 Summary 或其他元数据。
+
+要求：
+- 全文使用简体中文撰写。
+- 输出结构必须包含：
+  ## 精选亮点
+  - 针对每篇文章说明积极亮点，若有 URL 且可引用请使用 Markdown 链接。
+  ## 正面影响
+  - 至少 3 条要点，基于正文中的具体细节，解释这些新闻如何带来积极影响。
+  ## 鼓励寄语
+  - 以温暖的一句话鼓励读者。
+- 请引用正文中的关键信息，不要虚构内容。若信息不足，请明确指出。
+- 文字不少于 400 字。
+"""
+_SUMMARY_SYSTEM_MESSAGE = {"role": "system", "content": SUMMARY_SYSTEM_PROMPT}
+
+
 class GoodNewsSummarizer:
     def __init__(
         self, config: GoodNewsConfig, client: openai.OpenAI | None = None
@@ -383,49 +644,18 @@ class GoodNewsSummarizer:
         if not articles:
             return "## 精选亮点\n- 无法找到今日的正面新闻。\n\n## 正面影响\n- 期待明天会传来更好的消息。\n\n## 鼓励寄语\n继续保持希望，新的祝福就在路上。"
 
-        client = self._client or openai.OpenAI(api_key=ensure_env("OPENAI_API_KEY", "OpenAI API key"))
+        if self._client is None:
+            ensure_env("OPENAI_API_KEY", "OpenAI API key")
+            self._client = get_openai_client()
+        client = self._client
         trailing = "\n".join(extra_notes) if extra_notes else "None"
         date_label = generated_at.strftime("%Y-%m-%d")
 
-        article_sections: list[str] = []
-        for idx, article in enumerate(articles, 1):
-            content_excerpt = article.content or "(no content fetched)"
-            if content_excerpt and len(content_excerpt) > self._config.fetch_max_chars:
-                content_excerpt = content_excerpt[: self._config.fetch_max_chars] + "..."
-            summary_text = article.description or "(no summary provided)"
-            article_sections.append(
-                (
-                    "Article {idx}\nTitle: {title}\nSource: {source}\nAuthor: {author}\nPublished: {published}\nURL: {url}\nSummary: {summary}\nFull Text Excerpt:\n{content}"
-                ).format(
-                    idx=idx,
-                    title=article.title,
-                    source=article.source or "(unknown source)",
-                    author=article.author or "(unknown author)",
-                    published=article.published_at or "(unknown time)",
-                    url=article.url or "(no URL)",
-                    summary=summary_text,
-                    content=content_excerpt,
-                )
-            )
-
-        context_block = "\n\n---\n\n".join(article_sections)
-
-        user_prompt = f"""
-今天日期：{date_label}
+        context_block = "\n\n---\n\n".join(
+            _format_prompt_article(idx, article) for idx, article in enumerate(articles, 1)
+        )
 
-以下提供了若干正面新闻的原文内容。请严格依据 Full Text Excerpt（若存在）撰写总结，如若全文不可用，可参考 Summary 或其他元数据。
-
-要求：
-- 全文使用简体中文撰写。
-- 输出结构必须包含：
-  ## 精选亮点
-  - 针对每篇文章说明积极亮点，若有 URL 且可引用请使用 Markdown 链接。
-  ## 正面影响
-  - 至少 3 条要点，基于正文中的具体细节，解释这些新闻如何带来积极影响。
-  ## 鼓励寄语
-  - 以温暖的一句话鼓励读者。
-- 请引用正文中的关键信息，不要虚构内容。若信息不足，请明确指出。
-- 文字不少于 400 字。
+        user_prompt = f"""今天日期：{date_label}
 
 文章内容：
 {context_block}
@@ -433,15 +663,12 @@ class GoodNewsSummarizer:
 额外说明：{trailing}
 """
 
-        response = client.chat.completions.create(
+        response = cached_chat_create(
+            client,
+            SUMMARY_CACHE_TTL,
+            enabled=self._config.llm_cache_enabled,
             model=self._config.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an upbeat journalist who only writes truthful, uplifting reports in Simplified Chinese. Always ground your writing in the provided article content.",
-                },
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=[_SUMMARY_SYSTEM_MESSAGE, {"role": "user", "content": user_prompt}],
             temperature=0.45,
             max_tokens=1400,
         )
@@ -461,16 +688,38 @@ class GoodNewsService:
         self._summarizer = summarizer or GoodNewsSummarizer(config)
 
     def _current_time(self) -> datetime:
-        target_tz = tz.gettz(self._config.timezone) or tz.UTC
-        now_utc = datetime.utcnow().replace(tzinfo=tz.UTC)
-        return now_utc.astimezone(target_tz)
+        try:
+            target_tz = ZoneInfo(self._config.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            target_tz = timezone.utc
+        return datetime.now(target_tz)
 
     def generate(
         self,
         now: datetime | None = None,
         write: bool = True,
+        force: bool = False,
     ) -> GoodNewsDigest:
+        """Fetch, summarize and (with write) save today's digest.
+
+        An existing digest is never overwritten. Unless force is set, it is returned as-is
+        without fetching or summarizing again.
+        """
         generated_at = now or self._current_time()
+        output_dir = self._config.output_dir
+        output_path = output_dir / f"{generated_at.strftime('%Y-%m-%d')}.md"
+
+        if write and not force and output_path.exists():
+            return GoodNewsDigest(
+                report=output_path.read_text(encoding="utf-8"),
+                summary="",
+                articles=tuple(),
+                raw_feed="",
+                extra_notes=tuple(),
+                output_path=output_path,
+                written=False,
+            )
+
         fetch_result = self._fetcher.fetch()
 
         if not fetch_result.raw_feed:
@@ -483,9 +732,6 @@ class GoodNewsService:
         summary_body = self._summarizer.summarize(articles, fetch_result.extra_notes, generated_at)
         report = build_report(summary_body, articles, fetch_result.extra_notes, generated_at)
 
-        output_dir = self._config.output_dir
-        output_path = output_dir / f"{generated_at.strftime('%Y-%m-%d')}.md"
-
         written = False
         if write:
             output_dir.mkdir(parents=True, exist_ok=True)
@@ -526,6 +772,11 @@ def load_config() -> GoodNewsConfig:
     fetch_server_args = resolve_news_server_args(fetch_server_template, fetch_server_dir)
     fetch_max_chars = int(os.getenv("FETCH_MCP_MAX_LENGTH", "4000"))
     fetch_article_limit = int(os.getenv("FETCH_MCP_ARTICLE_LIMIT", "3"))
+    fetch_concurrency = int(os.getenv("FETCH_MCP_CONCURRENCY", "4"))
+    search_timeout = float(os.getenv("MCP_SEARCH_TIMEOUT", "30"))
+    fetch_timeout = float(os.getenv("MCP_FETCH_TIMEOUT", "20"))
+    llm_cache_enabled = os.getenv("GOOD_NEWS_CACHE_DISABLE") != "1"
+    fetch_cache_dir = Path(os.getenv("FETCH_CACHE_DIR", os.path.join(".cache", "fetch"))) if llm_cache_enabled else None
 
     return GoodNewsConfig(
         query=query,
@@ -541,25 +792,39 @@ def load_config() -> GoodNewsConfig:
         fetch_server_args=fetch_server_args,
         fetch_max_chars=fetch_max_chars,
         fetch_article_limit=fetch_article_limit,
+        llm_cache_enabled=llm_cache_enabled,
+        fetch_concurrency=fetch_concurrency,
+        fetch_cache_dir=fetch_cache_dir,
+        search_timeout=search_timeout,
+        fetch_timeout=fetch_timeout,
     )
 
 
-def main() -> None:
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate today's good news digest.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Fetch and summarize again even if today's digest exists (the file is left untouched).",
+    )
+    args = parser.parse_args(argv)
+
     try:
         config = load_config()
-        openai_client = openai.OpenAI(api_key=ensure_env("OPENAI_API_KEY", "OpenAI API key"))
+        ensure_env("OPENAI_API_KEY", "OpenAI API key")
     except RuntimeError as exc:
         print(f"Error: {exc}")
         return
 
+    # The summarizer builds its OpenAI client on first use, so an early exit never imports openai.
     service = GoodNewsService(
         config,
         fetcher=GoodNewsFetcher(config),
-        summarizer=GoodNewsSummarizer(config, client=openai_client),
+        summarizer=GoodNewsSummarizer(config),
     )
 
     try:
-        digest = service.generate()
+        digest = service.generate(force=args.force)
     except Exception as exc:
         print(f"Failed to create good news digest: {exc}")
         return
@@ -0,0 +1,23 @@
+import asyncio
+import unittest
+from tempfile import TemporaryDirectory
+from unittest.mock import AsyncMock, patch
+
+import daily_all
+
+
+class DailyAllTest(unittest.TestCase):
+    def test_runs_both_jobs_and_reports_a_failing_one(self):
+        with TemporaryDirectory() as out_dir, patch.object(daily_all.generate_devotional, "OUT_DIR", out_dir), patch.object(
+            daily_all.generate_devotional, "generate_days", AsyncMock()
+        ) as generate_days, patch.object(daily_all.good_news, "main", side_effect=RuntimeError("boom")), patch(
+            "builtins.print"
+        ) as mock_print:
+            asyncio.run(daily_all.main_async())
+
+        generate_days.assert_awaited_once()
+        mock_print.assert_called_once_with("Failed to generate good news: boom")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,32 +1,32 @@
+import asyncio
+import os
 import unittest
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from zoneinfo import ZoneInfo
 
 import generate_devotional as devotional
 
 
 class GenerateDevotionalPromptTest(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("openai.AsyncOpenAI")
+        mock_openai_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_client = mock_openai_class.return_value
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content="ok"))]
+        self.mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
     def _capture_user_prompt(self, theme: str) -> str:
-        with patch("generate_devotional.openai.OpenAI") as mock_openai_class:
-            mock_client = MagicMock()
-            mock_openai_class.return_value = mock_client
-
-            mock_response = MagicMock()
-            mock_response.choices = [MagicMock(message=MagicMock(content="ok"))]
-            mock_client.chat.completions.create.return_value = mock_response
-
-            devotional.generate_devotional_with_ai(
-                theme,
-                ["James 1:5"],
-                datetime(2026, 2, 17),
-            )
+        asyncio.run(devotional.generate_devotional_with_ai(theme, ["James 1:5"], datetime(2026, 2, 17)))
 
-            call_kwargs = mock_client.chat.completions.create.call_args.kwargs
-            messages = call_kwargs["messages"]
-            return next(msg["content"] for msg in messages if msg["role"] == "user")
+        messages = self.mock_client.chat.completions.create.call_args.kwargs["messages"]
+        return next(msg["content"] for msg in messages if msg["role"] == "user")
 
-    @patch("generate_devotional.openai.OpenAI")
-    def test_prompt_includes_theme_specific_prayer_points_for_time_management(self, _):
+    def test_prompt_includes_theme_specific_prayer_points_for_time_management(self):
         user_prompt = self._capture_user_prompt("Time Management and Wisdom")
         self.assertIn(
             "wisdom to manage time and to make wise judgments in the age of artificial intelligence",
@@ -41,8 +41,7 @@ class GenerateDevotionalPromptTest(unittest.TestCase):
             user_prompt,
         )
 
-    @patch("generate_devotional.openai.OpenAI")
-    def test_prompt_includes_theme_specific_prayer_points_for_children(self, _):
+    def test_prompt_includes_theme_specific_prayer_points_for_children(self):
         user_prompt = self._capture_user_prompt("Children's Education/Prayer for Children")
         self.assertIn("my younger son to become obedient and dependable", user_prompt)
         self.assertNotIn(
@@ -53,18 +52,16 @@ class GenerateDevotionalPromptTest(unittest.TestCase):
     def test_theme_config_is_single_source_of_truth(self):
         self.assertTrue(hasattr(devotional, "THEME_CONFIG"))
         config = devotional.THEME_CONFIG
-        self.assertIn("Family Responsibility and Care", config)
-        self.assertIn("Children's Education/Prayer for Children", config)
-        self.assertIn("Time Management and Wisdom", config)
-        for theme in (
+        themes = {
             "Family Responsibility and Care",
             "Children's Education/Prayer for Children",
             "Time Management and Wisdom",
-        ):
-            self.assertIn("weight", config[theme])
-            self.assertIn("scriptures", config[theme])
-            self.assertIn("prayer_focus", config[theme])
-            self.assertIsInstance(config[theme]["scriptures"], list)
+        }
+        self.assertLessEqual(themes, config.keys())
+        for theme in sorted(themes):
+            with self.subTest(theme=theme):
+                self.assertLessEqual({"weight", "scriptures", "prayer_focus"}, config[theme].keys())
+                self.assertIsInstance(config[theme]["scriptures"], list)
 
     def test_theme_config_includes_related_scripture_for_new_prayer_focuses(self):
         config = devotional.THEME_CONFIG
@@ -73,5 +70,90 @@ class GenerateDevotionalPromptTest(unittest.TestCase):
         self.assertIn("Philippians 1:9-10", config["Time Management and Wisdom"]["scriptures"])
 
 
+class _FakeStream:
+    def __init__(self, deltas, fail=False):
+        self._events = [SimpleNamespace(type="content.delta", delta=delta) for delta in deltas]
+        self._fail = fail
+        self._content = "".join(deltas)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for event in self._events:
+            yield event
+        if self._fail:
+            raise RuntimeError("connection dropped")
+
+    async def get_final_completion(self):
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=self._content))])
+
+
+class GenerateDaysTest(unittest.TestCase):
+    def _client(self, deltas=("## 经文", "\n正文"), **stream_kwargs):
+        mock_client = MagicMock()
+        mock_client.chat.completions.stream = MagicMock(
+            side_effect=lambda **kwargs: _FakeStream(list(deltas), **stream_kwargs)
+        )
+        mock_client.close = AsyncMock()
+        return mock_client
+
+    @patch("openai.AsyncOpenAI")
+    def test_generate_days_writes_one_file_per_missing_date(self, mock_openai_class):
+        mock_client = self._client()
+        mock_openai_class.return_value = mock_client
+        now_local = datetime(2026, 2, 17, 6, 0, tzinfo=ZoneInfo("America/Los_Angeles"))
+
+        with TemporaryDirectory() as out_dir:
+            dates = devotional.missing_dates(now_local.date(), 3, out_dir)
+            asyncio.run(devotional.generate_days(dates, now_local, concurrency=2, out_dir=out_dir))
+            written = sorted(os.listdir(out_dir))
+            with open(os.path.join(out_dir, "2026-02-17.md"), encoding="utf-8") as f:
+                content = f.read()
+
+        self.assertEqual(written, ["2026-02-15.md", "2026-02-16.md", "2026-02-17.md"])
+        self.assertEqual(mock_client.chat.completions.stream.call_count, 3)
+        self.assertEqual(content, devotional.render_devotional("2026-02-17", "## 经文\n正文", now_local))
+        mock_client.close.assert_awaited_once()
+
+    def test_stream_devotional_to_file_keeps_text_after_the_last_newline(self):
+        now_local = datetime(2026, 2, 17, 6, 0, tzinfo=ZoneInfo("America/Los_Angeles"))
+        client = self._client(deltas=["## 经", "文\n", "正", "文"])
+
+        with TemporaryDirectory() as out_dir:
+            out_path = os.path.join(out_dir, "2026-02-17.md")
+            asyncio.run(
+                devotional.stream_devotional_to_file(client, "Theme", ["James 1:5"], now_local, "2026-02-17", out_path, now_local)
+            )
+            with open(out_path, encoding="utf-8") as f:
+                content = f.read()
+
+        self.assertEqual(content, devotional.render_devotional("2026-02-17", "## 经文\n正文", now_local))
+
+    def test_stream_devotional_to_file_replaces_partial_text_with_error_body(self):
+        now_local = datetime(2026, 2, 17, 6, 0, tzinfo=ZoneInfo("America/Los_Angeles"))
+
+        with TemporaryDirectory() as out_dir:
+            out_path = os.path.join(out_dir, "2026-02-17.md")
+            asyncio.run(
+                devotional.stream_devotional_to_file(
+                    self._client(fail=True), "Theme", ["James 1:5"], now_local, "2026-02-17", out_path, now_local
+                )
+            )
+            with open(out_path, encoding="utf-8") as f:
+                content = f.read()
+            leftovers = os.listdir(out_dir)
+
+        self.assertEqual(leftovers, ["2026-02-17.md"])
+        self.assertIn("**Error**", content)
+        self.assertNotIn("## 经文", content)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,72 @@
+import argparse
+import datetime
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from zoneinfo import ZoneInfo
+
+import generate_devotional_batch as batch
+
+
+class GenerateDevotionalBatchTest(unittest.TestCase):
+    def test_missing_dates_skips_days_that_already_have_a_file(self):
+        with TemporaryDirectory() as out_dir:
+            open(os.path.join(out_dir, "2026-02-16.md"), "w").close()
+
+            dates = batch.missing_dates(datetime.date(2026, 2, 17), 3, out_dir)
+
+        self.assertEqual(dates, [datetime.date(2026, 2, 15), datetime.date(2026, 2, 17)])
+
+    def test_build_batch_lines_keys_each_request_by_date(self):
+        dates = [datetime.date(2026, 2, 16), datetime.date(2026, 2, 17)]
+
+        lines = [json.loads(line) for line in batch.build_batch_lines(dates, ZoneInfo("America/Los_Angeles"))]
+
+        self.assertEqual([line["custom_id"] for line in lines], ["2026-02-16", "2026-02-17"])
+        self.assertEqual(lines[0]["url"], "/v1/chat/completions")
+        self.assertIn("Today's Date: 2026-02-16", lines[0]["body"]["messages"][1]["content"])
+
+    def test_build_batch_lines_is_reproducible_per_date(self):
+        dates = [datetime.date(2026, 2, 16), datetime.date(2026, 2, 17)]
+        la_tz = ZoneInfo("America/Los_Angeles")
+
+        self.assertEqual(batch.build_batch_lines(dates, la_tz), batch.build_batch_lines(dates, la_tz))
+
+    def test_parse_backfill_range_is_inclusive(self):
+        self.assertEqual(
+            batch.parse_backfill_range("2026-02-27..2026-03-01"),
+            [datetime.date(2026, 2, 27), datetime.date(2026, 2, 28), datetime.date(2026, 3, 1)],
+        )
+        self.assertEqual(batch.parse_backfill_range("2026-02-27"), [datetime.date(2026, 2, 27)])
+        with self.assertRaises(argparse.ArgumentTypeError):
+            batch.parse_backfill_range("2026-03-01..2026-02-27")
+
+    def test_write_batch_output_writes_successful_results_only(self):
+        output_text = "\n".join(
+            [
+                json.dumps(
+                    {
+                        "custom_id": "2026-02-16",
+                        "response": {"body": {"choices": [{"message": {"content": "## 经文"}}]}},
+                    }
+                ),
+                json.dumps({"custom_id": "2026-02-17", "response": None, "error": {"message": "boom"}}),
+            ]
+        )
+        generated_at = datetime.datetime(2026, 2, 18, 6, 0, tzinfo=datetime.timezone.utc)
+
+        with TemporaryDirectory() as out_dir:
+            written = batch.write_batch_output(output_text, generated_at, out_dir)
+            with open(written[0], encoding="utf-8") as f:
+                content = f.read()
+            leftovers = sorted(os.listdir(out_dir))
+
+        self.assertEqual([os.path.basename(path) for path in written], ["2026-02-16.md"])
+        self.assertEqual(leftovers, ["2026-02-16.md"])
+        self.assertTrue(content.startswith("# Daily Scripture and Devotion · 2026-02-16"))
+        self.assertIn("## 经文", content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,20 @@
+import anyio
+import asyncio
+import io
 import os
 import openai
 import unittest
+from contextlib import asynccontextmanager
 from dataclasses import replace
 from datetime import datetime, timezone
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 
+import mcp.types as types
+
+import good_news
 from good_news import (
     Article,
     GoodNewsConfig,
@@ -19,6 +28,10 @@ from good_news import (
     load_config,
 )
 
+# Live OpenAI tests are opt-in: they cost money and take seconds each.
+RUN_LIVE_OPENAI = os.getenv("RUN_LIVE_OPENAI") == "1" and bool(os.getenv("OPENAI_API_KEY"))
+_LIVE_NEWS_OK = RUN_LIVE_OPENAI and bool(os.getenv("NEWS_API_KEY"))
+
 
 class EnsureEnvTest(unittest.TestCase):
     def test_returns_existing_value(self) -> None:
@@ -80,6 +93,30 @@ class ParseArticlesTest(unittest.TestCase):
         self.assertEqual(articles[1].title, "Community Triumph")
         self.assertEqual(articles[1].url, "https://example.com/another")
 
+    def test_parse_articles_keeps_multiline_excerpt_and_prefers_summary(self) -> None:
+        raw_feed = (
+            "Article 1:\n"
+            "Title: Joyful Discovery\n"
+            "Description: Older blurb.\n"
+            "Summary: Scientists report a breakthrough.\n"
+            "Full Text Excerpt: First paragraph.\n"
+            "Title: not a field inside the excerpt\n"
+        )
+
+        article = parse_articles(raw_feed)[0]
+
+        self.assertEqual(article.description, "Scientists report a breakthrough.")
+        self.assertEqual(article.content, "First paragraph.\nTitle: not a field inside the excerpt")
+        self.assertEqual(article.title, "Joyful Discovery")
+
+    def test_parse_articles_reads_inline_fields_after_the_article_number(self) -> None:
+        raw_feed = "Article 1: Title: Foo\nURL: http://a\n\nArticle 2: Title: Bar\nURL: http://b"
+
+        articles = parse_articles(raw_feed)
+
+        self.assertEqual([a.title for a in articles], ["Foo", "Bar"])
+        self.assertEqual([a.url for a in articles], ["http://a", "http://b"])
+
     def test_parse_articles_returns_empty_for_blank_feed(self) -> None:
         self.assertEqual(parse_articles(""), tuple())
 
@@ -144,40 +181,242 @@ class GoodNewsFetcherParseDDGResultsTest(unittest.TestCase):
         self.assertEqual(articles[1].url, "https://example.com/bbc")
 
 
+class TruncateExcerptTest(unittest.TestCase):
+    @patch("good_news.tiktoken", None)
+    def test_falls_back_to_characters_without_tiktoken(self) -> None:
+        good_news._token_encoding.cache_clear()
+        self.addCleanup(good_news._token_encoding.cache_clear)
+
+        self.assertEqual(good_news.truncate_excerpt("short", 10, "gpt-4o-mini"), "short")
+        self.assertEqual(good_news.truncate_excerpt("a" * 12, 10, "gpt-4o-mini"), "a" * 10 + "...")
+
+    def test_falls_back_to_characters_when_the_encoding_cannot_load(self) -> None:
+        good_news._token_encoding.cache_clear()
+        self.addCleanup(good_news._token_encoding.cache_clear)
+        fake_tiktoken = MagicMock()
+        fake_tiktoken.encoding_for_model.side_effect = OSError("network unreachable")
+
+        with patch("good_news.tiktoken", fake_tiktoken):
+            self.assertEqual(good_news.truncate_excerpt("a" * 12, 10, "gpt-4o-mini"), "a" * 10 + "...")
+
+
+class GoodNewsFetcherComposeFeedTest(unittest.TestCase):
+    def test_compose_feed_appends_one_section_per_article(self) -> None:
+        fetcher = GoodNewsFetcher(load_config())
+        articles = [
+            Article(title="Kind Neighbors", url="https://example.com/a", content="Full story."),
+            Article(title="No Link", description="Short blurb."),
+        ]
+
+        feed = fetcher._compose_feed("1. Kind Neighbors", articles)
+
+        self.assertEqual(
+            feed,
+            "1. Kind Neighbors\n\n"
+            "Article 1\nTitle: Kind Neighbors\nURL: https://example.com/a\nFull Text Excerpt:\nFull story.\n\n"
+            "Article 2\nTitle: No Link\nSummary: Short blurb.",
+        )
+
+    def test_parse_articles_round_trips_a_composed_feed_without_the_preface(self) -> None:
+        fetcher = GoodNewsFetcher(load_config())
+        articles = (
+            Article(title="Kind Neighbors", url="https://example.com/a", content="Full story."),
+            Article(title="No Link", description="Short blurb."),
+        )
+
+        feed = fetcher._compose_feed("1. Kind Neighbors\nURL: https://example.com/a", articles)
+
+        self.assertEqual(parse_articles(feed), articles)
+
+
+class _FakeFetchSession:
+    def __init__(self, *streams) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fetched: list[str] = []
+
+    async def __aenter__(self):
+        _FakeFetchSession.instance = self
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def initialize(self) -> None:
+        return None
+
+    async def call_tool(self, name, arguments):
+        self.fetched.append(arguments["url"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if arguments["url"].endswith("broken"):
+            raise RuntimeError("fetch failed")
+        if arguments["url"].endswith("stuck"):
+            await asyncio.sleep(60)
+        text = types.TextContent(type="text", text=f"body of {arguments['url']}")
+        return SimpleNamespace(content=[text], isError=False)
+
+
+@asynccontextmanager
+async def _fake_stdio_client(server_params):
+    # Like the real client, holds an anyio task group (a cancel scope) open for the session's
+    # life, so entering and exiting it from different tasks fails here as it does for real.
+    async with anyio.create_task_group():
+        yield None, None
+
+
+class GoodNewsFetcherEnrichTest(unittest.TestCase):
+    ARTICLES = [
+        Article(title="a", url="https://example.com/a"),
+        Article(title="b", url="https://example.com/broken"),
+        Article(title="a again", url="https://example.com/a"),
+        Article(title="c", url="https://example.com/c"),
+    ]
+
+    def _enrich(self, cache_dir: str):
+        config = replace(load_config(), fetch_article_limit=3, fetch_concurrency=2, fetch_cache_dir=Path(cache_dir))
+        return asyncio.run(GoodNewsFetcher(config)._enrich_articles_with_content(self.ARTICLES))
+
+    @patch("mcp.client.session.ClientSession", _FakeFetchSession)
+    @patch("mcp.client.stdio.stdio_client", _fake_stdio_client)
+    def test_enrich_fetches_urls_concurrently_and_skips_failures(self) -> None:
+        with TemporaryDirectory() as cache_dir:
+            enriched = self._enrich(cache_dir)
+
+        self.assertEqual(_FakeFetchSession.instance.max_in_flight, 2)
+        self.assertEqual(enriched[0].content, "body of https://example.com/a")
+        self.assertIsNone(enriched[1].content)
+        self.assertEqual(enriched[2].content, "body of https://example.com/a")
+        self.assertEqual(enriched[3].content, "body of https://example.com/c")
+
+    @patch("mcp.client.session.ClientSession", _FakeFetchSession)
+    @patch("mcp.client.stdio.stdio_client", _fake_stdio_client)
+    def test_enrich_reads_cached_pages_and_only_fetches_the_rest(self) -> None:
+        with TemporaryDirectory() as cache_dir:
+            self._enrich(cache_dir)
+            enriched = self._enrich(cache_dir)
+
+        self.assertEqual(_FakeFetchSession.instance.fetched, ["https://example.com/broken"])
+        self.assertEqual(enriched[3].content, "body of https://example.com/c")
+
+    @patch("mcp.client.session.ClientSession", _FakeFetchSession)
+    @patch("mcp.client.stdio.stdio_client", _fake_stdio_client)
+    def test_enrich_gives_up_on_a_stuck_fetch(self) -> None:
+        articles = [Article(title="a", url="https://example.com/a"), Article(title="s", url="https://example.com/stuck")]
+        with TemporaryDirectory() as cache_dir:
+            config = replace(load_config(), fetch_timeout=0.05, fetch_cache_dir=Path(cache_dir))
+            enriched = asyncio.run(GoodNewsFetcher(config)._enrich_articles_with_content(articles))
+
+        self.assertEqual(enriched[0].content, "body of https://example.com/a")
+        self.assertIsNone(enriched[1].content)
+
+
+class _FakeSearchAndFetchSession(_FakeFetchSession):
+    started: list[str] = []
+
+    async def initialize(self) -> None:
+        _FakeSearchAndFetchSession.started.append("initialize")
+
+    async def call_tool(self, name, arguments):
+        if name != "search":
+            return await super().call_tool(name, arguments)
+        report = "1. Kind Neighbors\nURL: https://example.com/a\nSummary: Volunteers helped."
+        return SimpleNamespace(content=[types.TextContent(type="text", text=report)], isError=False)
+
+
+class GoodNewsFetcherFetchAsyncTest(unittest.TestCase):
+    @patch("mcp.client.session.ClientSession", _FakeSearchAndFetchSession)
+    @patch("mcp.client.stdio.stdio_client", _fake_stdio_client)
+    def test_fetch_async_starts_the_fetch_server_alongside_search(self) -> None:
+        _FakeSearchAndFetchSession.started = []
+        with TemporaryDirectory() as cache_dir:
+            config = replace(load_config(), fetch_article_limit=3, fetch_cache_dir=Path(cache_dir))
+            result = asyncio.run(GoodNewsFetcher(config)._fetch_async())
+
+        self.assertEqual(_FakeSearchAndFetchSession.started, ["initialize", "initialize"])
+        self.assertEqual(result.articles[0].content, "body of https://example.com/a")
+        self.assertIn("Full Text Excerpt:\nbody of https://example.com/a", result.raw_feed)
+
+
+class _FailingSearchSession(_FakeSearchAndFetchSession):
+    async def call_tool(self, name, arguments):
+        if name != "search":
+            return await super().call_tool(name, arguments)
+        return SimpleNamespace(content=[types.TextContent(type="text", text="quota exceeded")], isError=True)
+
+
+class GoodNewsFetcherSearchFailureTest(unittest.TestCase):
+    @patch("mcp.client.session.ClientSession", _FailingSearchSession)
+    @patch("mcp.client.stdio.stdio_client", _fake_stdio_client)
+    def test_search_error_unwinds_both_servers_cleanly(self) -> None:
+        with TemporaryDirectory() as cache_dir:
+            config = replace(load_config(), fetch_article_limit=3, fetch_cache_dir=Path(cache_dir))
+            with self.assertRaises(Exception) as caught:
+                asyncio.run(GoodNewsFetcher(config)._fetch_async())
+
+        # anyio task groups wrap the error in exception groups, as the real stdio_client does.
+        error = caught.exception
+        while isinstance(error, BaseExceptionGroup):
+            [error] = error.exceptions
+        self.assertEqual(str(error), "MCP server reported an error: quota exceeded")
+
+
 class GoodNewsSummarizerTest(unittest.TestCase):
-    def _config(self, tmp_dir: Path) -> GoodNewsConfig:
-        base = load_config()
-        return replace(base, output_dir=tmp_dir)
+    @classmethod
+    def setUpClass(cls) -> None:
+        # Environment-derived and unchanged by the tests, so read once per class.
+        cls._base_config = load_config()
+
+    def setUp(self) -> None:
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config = replace(self._base_config, output_dir=Path(tmp.name))
+        self.now = datetime.now(timezone.utc)
 
     def test_returns_fallback_when_no_articles(self) -> None:
-        with TemporaryDirectory() as tmp_dir:
-            config = self._config(Path(tmp_dir))
-            summarizer = GoodNewsSummarizer(config)
-            result = summarizer.summarize(tuple(), tuple(), datetime.now(timezone.utc))
+        summarizer = GoodNewsSummarizer(self.config)
+        result = summarizer.summarize(tuple(), tuple(), self.now)
 
         self.assertIn("无法找到今日的正面新闻", result)
 
-    @unittest.skipUnless(os.getenv("OPENAI_API_KEY"), "Requires OPENAI_API_KEY")
+    def test_summarize_fills_placeholders_for_missing_article_fields(self) -> None:
+        client = MagicMock()
+        client.chat.completions.create.return_value.choices = [SimpleNamespace(message=SimpleNamespace(content=" ok "))]
+        config = replace(self.config, llm_cache_enabled=False)
+        result = GoodNewsSummarizer(config, client=client).summarize(
+            (Article(title="Kind Neighbors", url="https://example.com/a"),), tuple(), self.now
+        )
+
+        prompt = client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        self.assertEqual(result, "ok")
+        self.assertIn(
+            "Article 1\nTitle: Kind Neighbors\nSource: (unknown source)\nAuthor: (unknown author)\n"
+            "Published: (unknown time)\nURL: https://example.com/a\nSummary: (no summary provided)\n"
+            "Full Text Excerpt:\n(no content fetched)",
+            prompt,
+        )
+
+    @unittest.skipUnless(RUN_LIVE_OPENAI, "Requires RUN_LIVE_OPENAI=1 and OPENAI_API_KEY")
     def test_summarize_with_real_openai(self) -> None:
-        with TemporaryDirectory() as tmp_dir:
-            config = self._config(Path(tmp_dir))
-            summarizer = GoodNewsSummarizer(config)
-            try:
-                result = summarizer.summarize(
-                    [
-                        Article(
-                            title="Community Garden Blossoms",
-                            source="Local News",
-                            url="https://example.com/garden",
-                        )
-                    ],
-                    tuple(),
-                    datetime.now(timezone.utc),
-                )
-            except openai.APIConnectionError as exc:
-                self.skipTest(f"OpenAI API unreachable: {exc}")
-            except openai.OpenAIError as exc:
-                self.skipTest(f"OpenAI API error: {exc}")
+        summarizer = GoodNewsSummarizer(self.config)
+        try:
+            result = summarizer.summarize(
+                [
+                    Article(
+                        title="Community Garden Blossoms",
+                        source="Local News",
+                        url="https://example.com/garden",
+                    )
+                ],
+                tuple(),
+                self.now,
+            )
+        except openai.APIConnectionError as exc:
+            self.skipTest(f"OpenAI API unreachable: {exc}")
+        except openai.OpenAIError as exc:
+            self.skipTest(f"OpenAI API error: {exc}")
 
         self.assertIn("## 精选亮点", result)
         self.assertIn("## 正面影响", result)
@@ -185,19 +424,96 @@ class GoodNewsSummarizerTest(unittest.TestCase):
 
 
 class GoodNewsServiceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # Environment-derived and unchanged by the tests, so read once per class.
+        cls._base_config = load_config()
+
     def _config(self, output_dir: Path) -> GoodNewsConfig:
-        base = load_config()
-        return replace(base, output_dir=output_dir)
+        return replace(self._base_config, output_dir=output_dir)
+
+    def _service(self, output_dir: Path):
+        fetcher = MagicMock()
+        fetcher.fetch.return_value = good_news.FetchResult(
+            "Article 1:\nTitle: Kind Neighbors\nURL: https://example.com/a", tuple(), tuple()
+        )
+        summarizer = MagicMock()
+        summarizer.summarize.return_value = "## 精选亮点\n- new"
+        return GoodNewsService(self._config(output_dir), fetcher=fetcher, summarizer=summarizer), fetcher
+
+    def test_generate_returns_existing_digest_without_fetching(self) -> None:
+        now = datetime(2026, 2, 17, 6, 30, tzinfo=timezone.utc)
+        with TemporaryDirectory() as tmp_dir:
+            (Path(tmp_dir) / "2026-02-17.md").write_text("existing", encoding="utf-8")
+            service, fetcher = self._service(Path(tmp_dir))
+
+            digest = service.generate(now=now)
+            forced = service.generate(now=now, force=True)
+            on_disk = (Path(tmp_dir) / "2026-02-17.md").read_text(encoding="utf-8")
+
+        self.assertEqual(digest.report, "existing")
+        self.assertFalse(digest.written)
+        self.assertEqual(fetcher.fetch.call_count, 1)
+        self.assertIn("- new", forced.report)
+        self.assertFalse(forced.written)
+        self.assertEqual(on_disk, "existing")
+
+
+class GoodNewsServiceIntegrationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        if not _LIVE_NEWS_OK:
+            raise unittest.SkipTest("Requires RUN_LIVE_OPENAI=1, OPENAI_API_KEY and NEWS_API_KEY")
+        cls._base_config = load_config()
+
+    def setUp(self) -> None:
+        self.now = datetime.now(timezone.utc)
+
+    def _config(self, output_dir: Path) -> GoodNewsConfig:
+        return replace(self._base_config, output_dir=output_dir)
+
+    def _artifact_dir(self, prefix: str) -> Path:
+        """Scratch directory for a test's digest and logs, removed afterwards.
+
+        With KEEP_TEST_ARTIFACTS=1 it is a timestamped directory under /tmp/test_artifacts
+        that is left in place for inspection.
+        """
+        if os.getenv("KEEP_TEST_ARTIFACTS") == "1":
+            unique_dir = Path("/tmp/test_artifacts") / self.now.strftime(f"{prefix}%Y%m%d%H%M%S%f")
+            unique_dir.mkdir(parents=True, exist_ok=True)
+            return unique_dir
+        tmp = TemporaryDirectory(prefix=prefix)
+        self.addCleanup(tmp.cleanup)
+        return Path(tmp.name)
+
+    def _dump_artifacts(self, unique_dir: Path, digest) -> str:
+        """Return the digest's fetch log; with KEEP_TEST_ARTIFACTS=1 also save every section in one file."""
+        fetch_text = (
+            "Raw feed:\n"
+            + digest.raw_feed
+            + "\n\nExtra notes:\n"
+            + ("\n".join(digest.extra_notes) if digest.extra_notes else "(none)")
+        )
+        if os.getenv("KEEP_TEST_ARTIFACTS") == "1":
+            articles_text = "\n\n---\n\n".join(
+                f"Title: {article.title}\nSource: {article.source}\nAuthor: {article.author}\n"
+                f"Published: {article.published_at}\nURL: {article.url}\n"
+                f"Content length: {len(article.content or '')}\nContent: \n{article.content or '(no content fetched)'}"
+                for article in digest.articles
+            )
+            buffer = io.StringIO()
+            for title, body in (
+                ("Fetch result", fetch_text),
+                ("Articles", articles_text),
+                ("Digest preview", digest.report),
+                ("Summary body", digest.summary),
+            ):
+                buffer.write(f"# {title}\n\n{body}\n\n")
+            (unique_dir / "all_artifacts.md").write_text(buffer.getvalue(), encoding="utf-8")
+        return fetch_text
 
-    @unittest.skipUnless(
-        os.getenv("OPENAI_API_KEY") and os.getenv("NEWS_API_KEY"),
-        "Requires OPENAI_API_KEY and NEWS_API_KEY",
-    )
     def test_generate_creates_digest_without_writing_when_disabled(self) -> None:
-        artifact_root = Path("/tmp/test_artifacts")
-        artifact_root.mkdir(parents=True, exist_ok=True)
-        unique_dir = artifact_root / datetime.now(timezone.utc).strftime("good_news_preview_%Y%m%d%H%M%S%f")
-        unique_dir.mkdir(parents=True, exist_ok=True)
+        unique_dir = self._artifact_dir("good_news_preview_")
 
         config = self._config(unique_dir)
         openai_client = openai.OpenAI(api_key=ensure_env("OPENAI_API_KEY", "OpenAI API key"))
@@ -208,69 +524,27 @@ class GoodNewsServiceTest(unittest.TestCase):
         )
         try:
             digest = service.generate(
-                now=datetime.now(timezone.utc),
+                now=self.now,
                 write=False,
             )
         except (openai.OpenAIError, RuntimeError, OSError) as exc:
             self.skipTest(f"Integration dependencies unavailable: {exc}")
 
-        fetch_log = unique_dir / "fetch_result.txt"
-        fetch_log.write_text(
-            "Raw feed:\n"
-            + digest.raw_feed
-            + "\n\nExtra notes:\n"
-            + ("\n".join(digest.extra_notes) if digest.extra_notes else "(none)"),
-            encoding="utf-8",
-        )
-
-        articles_log = unique_dir / "articles.txt"
-        articles_lines = [
-            (
-                "Title: {title}\nSource: {source}\nAuthor: {author}\nPublished: {published}\nURL: {url}\nContent length: {length}\nContent: \n{content}"
-            ).format(
-                title=article.title,
-                source=article.source,
-                author=article.author,
-                published=article.published_at,
-                url=article.url,
-                length=len(article.content or ""),
-                content=(article.content or "(no content fetched)"),
-            )
-            for article in digest.articles
-        ]
-        articles_log.write_text("\n\n---\n\n".join(articles_lines), encoding="utf-8")
-
-        preview_path = unique_dir / "digest_preview.md"
-        preview_path.write_text(digest.report, encoding="utf-8")
-
-        summary_path = unique_dir / "summary_body.md"
-        summary_path.write_text(digest.summary, encoding="utf-8")
+        fetch_text = self._dump_artifacts(unique_dir, digest)
 
         self.assertFalse(digest.written)
-        self.assertTrue(fetch_log.exists())
-        self.assertTrue(articles_log.exists())
-        fetch_contents = fetch_log.read_text(encoding="utf-8")
-        self.assertIn("Content:", fetch_contents)
-        self.assertTrue(preview_path.exists())
-        self.assertTrue(summary_path.exists())
-        self.assertTrue(preview_path.read_text(encoding="utf-8").strip())
+        self.assertIn("Content:", fetch_text)
+        self.assertTrue(digest.report.strip())
         self.assertTrue(digest.output_path.name.endswith(".md"))
 
-    @unittest.skipUnless(
-        os.getenv("OPENAI_API_KEY") and os.getenv("NEWS_API_KEY"),
-        "Requires OPENAI_API_KEY and NEWS_API_KEY",
-    )
     def test_generate_writes_digest_when_enabled(self) -> None:
-        artifact_root = Path("/tmp/test_artifacts")
-        artifact_root.mkdir(parents=True, exist_ok=True)
-        unique_dir = artifact_root / datetime.now(timezone.utc).strftime("good_news_%Y%m%d%H%M%S%f")
-        unique_dir.mkdir(parents=True, exist_ok=True)
+        unique_dir = self._artifact_dir("good_news_")
 
         config = self._config(unique_dir)
         service = GoodNewsService(config)
         try:
             digest = service.generate(
-                now=datetime.now(timezone.utc),
+                now=self.now,
                 write=True,
             )
         except (openai.OpenAIError, RuntimeError, OSError) as exc:
@@ -280,41 +554,11 @@ class GoodNewsServiceTest(unittest.TestCase):
         self.assertTrue(digest.output_path.exists())
         contents = digest.output_path.read_text(encoding="utf-8")
 
-        fetch_log = unique_dir / "fetch_result.txt"
-        fetch_log.write_text(
-            "Raw feed:\n"
-            + digest.raw_feed
-            + "\n\nExtra notes:\n"
-            + ("\n".join(digest.extra_notes) if digest.extra_notes else "(none)"),
-            encoding="utf-8",
-        )
-
-        articles_log = unique_dir / "articles.txt"
-        articles_lines = [
-            (
-                "Title: {title}\nSource: {source}\nAuthor: {author}\nPublished: {published}\nURL: {url}\nContent length: {length}\nContent: \n{content}"
-            ).format(
-                title=article.title,
-                source=article.source,
-                author=article.author,
-                published=article.published_at,
-                url=article.url,
-                length=len(article.content or ""),
-                content=(article.content or "(no content fetched)"),
-            )
-            for article in digest.articles
-        ]
-        articles_log.write_text("\n\n---\n\n".join(articles_lines), encoding="utf-8")
-
-        summary_path = unique_dir / "summary_body.md"
-        summary_path.write_text(digest.summary, encoding="utf-8")
+        fetch_text = self._dump_artifacts(unique_dir, digest)
 
         self.assertTrue(contents.strip())
         self.assertTrue(digest.output_path.name.endswith(".md"))
-        self.assertTrue(fetch_log.exists())
-        self.assertTrue(articles_log.exists())
-        self.assertIn("Content:", fetch_log.read_text(encoding="utf-8"))
-        self.assertTrue(summary_path.exists())
+        self.assertIn("Content:", fetch_text)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from openai.types.chat import ChatCompletion
+
+import _llm_cache
+
+
+def _completion(content):
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o",
+            "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+    )
+
+
+REQUEST = {"model": "gpt-4o", "messages": [{"role": "user", "content": "今天"}], "temperature": 0.7, "max_tokens": 10}
+
+
+class CachedChatCreateTest(unittest.TestCase):
+    def test_second_identical_call_is_served_from_disk_with_usage(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion("hello")
+
+        with TemporaryDirectory() as cache_dir:
+            _llm_cache.cached_chat_create(client, 60, cache_dir=cache_dir, **REQUEST)
+            cached = _llm_cache.cached_chat_create(client, 60, cache_dir=cache_dir, **REQUEST)
+
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        self.assertEqual(cached.choices[0].message.content, "hello")
+        self.assertEqual(cached.usage.total_tokens, 15)
+
+    def test_expired_entries_are_refetched(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion("hello")
+
+        with TemporaryDirectory() as cache_dir:
+            _llm_cache.cached_chat_create(client, 60, cache_dir=cache_dir, **REQUEST)
+            path = _llm_cache._path_for(_llm_cache.cache_key(**REQUEST), cache_dir)
+            os.utime(path, (0, 0))
+            _llm_cache.cached_chat_create(client, 60, cache_dir=cache_dir, **REQUEST)
+
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+
+    def test_disabled_cache_always_calls_the_api(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion("hello")
+
+        with TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                _llm_cache.cached_chat_create(client, 60, enabled=False, cache_dir=cache_dir, **REQUEST)
+            self.assertEqual(os.listdir(cache_dir), [])
+
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+
+    def test_async_variant_shares_the_cache(self):
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=_completion("hello"))
+
+        async def call_twice(cache_dir):
+            for _ in range(2):
+                result = await _llm_cache.async_cached_chat_create(client, 60, cache_dir=cache_dir, **REQUEST)
+            return result
+
+        with TemporaryDirectory() as cache_dir:
+            result = asyncio.run(call_twice(cache_dir))
+
+        self.assertEqual(client.chat.completions.create.await_count, 1)
+        self.assertEqual(result.choices[0].message.content, "hello")
+
+    def test_stream_variant_forwards_deltas_and_replays_cache_hits_whole(self):
+        class FakeStream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return None
+
+            async def __aiter__(self):
+                for delta in ("hel", "lo"):
+                    yield SimpleNamespace(type="content.delta", delta=delta)
+
+            async def get_final_completion(self):
+                return _completion("hello")
+
+        client = MagicMock()
+        client.chat.completions.stream = MagicMock(side_effect=lambda **kwargs: FakeStream())
+        deltas = []
+
+        async def call_twice(cache_dir):
+            for _ in range(2):
+                await _llm_cache.async_cached_chat_stream(client, 60, deltas.append, cache_dir=cache_dir, **REQUEST)
+
+        with TemporaryDirectory() as cache_dir:
+            asyncio.run(call_twice(cache_dir))
+
+        self.assertEqual(client.chat.completions.stream.call_count, 1)
+        self.assertEqual(deltas, ["hel", "lo", "hello"])
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_allows_a_burst_then_spaces_requests(self):
+        limiter = _llm_cache.RateLimiter(2, time_period=10.0)
+
+        delays = [limiter.reserve() for _ in range(4)]
+
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        self.assertAlmostEqual(delays[2], 5.0, delta=0.1)
+        self.assertAlmostEqual(delays[3], 10.0, delta=0.1)
+
+    def test_zero_rate_disables_the_limiter(self):
+        limiter = _llm_cache.RateLimiter(0)
+
+        self.assertEqual([limiter.reserve() for _ in range(100)], [0.0] * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
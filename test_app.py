@@ -0,0 +1,185 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+from test_comfort_support import FakeOpenAIClient
+from test_tts_service import _FakeTTSClient
+from tts_service import MAX_TTS_CHARS, TTSCache
+
+
+def _sse_events(body: str):
+    """(event, data) pairs of an SSE body; plain `data:` lines are reported as event "message"."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), fields["data"]))
+    return events
+
+
+class AppTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(app_module, "HAS_OPENAI_KEY", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app_module.app)
+
+    def use_chat_reply(self, service, payload):
+        fake = FakeOpenAIClient(json.dumps(payload, ensure_ascii=False))
+        patcher = patch.object(service, "client", fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return fake
+
+
+class BibleComfortStreamTest(AppTestCase):
+    def test_passage_events_are_capped_and_trimmed_like_the_full_response(self):
+        passage = {"ref": "Psalm 23:1", "short_quote": "耶和华是我的牧者", "reason": "r", "full_passage_text": "t"}
+        long_quote = dict(passage, ref="Psalm 23:4", short_quote="我虽然行过死荫的幽谷，也不怕遭害，" * 3)
+        self.use_chat_reply(
+            app_module.comfort_service,
+            {"passages": [long_quote, passage, passage], "devotional": "Comfort", "disclaimer": ""},
+        )
+
+        response = self.client.post(
+            "/bible-comfort/stream", json={"language": "zh", "situation": "难以入睡", "max_passages": 2}
+        )
+
+        passages = [json.loads(data) for event, data in _sse_events(response.text) if event == "passages"]
+        self.assertEqual([p["ref"] for p in passages], ["Psalm 23:4", "Psalm 23:1"])
+        self.assertEqual(passages[0]["short_quote"], "")
+        self.assertEqual(passages[1]["short_quote"], "耶和华是我的牧者")
+
+    def test_stream_closes_with_the_normalized_result(self):
+        passage = {"ref": "Psalm 23:1", "short_quote": "The LORD is my shepherd", "reason": "r", "full_passage_text": "t"}
+        self.use_chat_reply(
+            app_module.comfort_service, {"passages": [passage, passage], "devotional": "Comfort", "disclaimer": ""}
+        )
+
+        response = self.client.post(
+            "/bible-comfort/stream", json={"language": "en", "situation": "Can't sleep", "max_passages": 1}
+        )
+
+        events = _sse_events(response.text)
+        self.assertEqual([event for event, _ in events[-2:]], ["result", "message"])
+        result = json.loads(events[-2][1])
+        self.assertEqual(len(result["passages"]), 1)
+        self.assertTrue(result["disclaimer"])
+        self.assertEqual(events[-1][1], "[DONE]")
+
+
+
+class BibleComfortBatchRouteTest(AppTestCase):
+    def test_rejects_empty_and_oversize_batches(self):
+        query = {"language": "en", "situation": "Lonely"}
+
+        for size in (0, app_module.MAX_BATCH_QUERIES + 1):
+            with self.subTest(size=size):
+                response = self.client.post("/bible-comfort/batch", json=[query] * size)
+
+                self.assertEqual(response.status_code, 422)
+
+    def test_submits_a_batch_and_reports_its_status(self):
+        batch = {"id": "batch-1", "status": "validating", "results": []}
+        with patch.object(app_module.comfort_service, "submit_batch", AsyncMock(return_value=batch)) as submit, patch.object(
+            app_module.comfort_service, "get_batch", AsyncMock(return_value=dict(batch, status="completed"))
+        ):
+            created = self.client.post("/bible-comfort/batch", json=[{"situation": "失眠"}])
+            status = self.client.get("/bible-comfort/batch/batch-1")
+
+        self.assertEqual(created.json(), batch)
+        self.assertEqual(len(submit.await_args.args[0]), 1)
+        self.assertEqual(status.json()["status"], "completed")
+
+    def test_unknown_batch_is_404(self):
+        with patch.object(
+            app_module.comfort_service, "get_batch", side_effect=app_module.BatchNotFoundError("batch-x")
+        ):
+            response = self.client.get("/bible-comfort/batch/batch-x")
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ServiceErrorHandlerTest(AppTestCase):
+    def test_service_value_and_runtime_errors_are_bad_gateway(self):
+        for error in (ValueError("LLM returned invalid JSON"), RuntimeError("LLM API call failed")):
+            with self.subTest(error=type(error).__name__), patch.object(
+                app_module.comfort_service, "get_comfort_with_cache_status", AsyncMock(side_effect=error)
+            ):
+                response = self.client.post("/bible-comfort", json={"situation": "难以入睡"})
+
+                self.assertEqual(response.status_code, 502)
+                self.assertEqual(response.json(), {"detail": str(error)})
+
+
+class TTSRouteTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = TTSCache(tmp.name)
+        self.tts_client = _FakeTTSClient([b"ID3", b"data"])
+        for target, attribute, value in (
+            (app_module, "tts_cache", self.cache),
+            (app_module.tts_service, "client", self.tts_client),
+        ):
+            patcher = patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_miss_streams_audio_then_hit_redirects_to_the_immutable_url(self):
+        body = {"text": "愿你平安。", "format": "mp3"}
+
+        miss = self.client.post("/tts", json=body)
+        hit = self.client.post("/tts", json=body, follow_redirects=False)
+        audio = self.client.get(hit.headers["location"])
+
+        self.assertEqual((miss.status_code, miss.content), (200, b"ID3data"))
+        self.assertEqual(hit.status_code, 303)
+        self.assertRegex(hit.headers["location"], r"^/tts/[0-9a-f]{64}\.mp3$")
+        self.assertEqual(audio.content, b"ID3data")
+        self.assertEqual(audio.headers["content-type"], "audio/mpeg")
+        self.assertEqual(audio.headers["cache-control"], "public, max-age=31536000, immutable")
+        self.assertEqual(audio.headers["etag"], miss.headers["etag"])
+
+    def test_matching_if_none_match_is_304(self):
+        key = app_module.tts_service.cache_key("愿你平安。", "zh", None, "mp3")
+        etag = {"If-None-Match": f'"{key}"'}
+
+        post = self.client.post("/tts", json={"text": "愿你平安。"}, headers=etag)
+        get = self.client.get(f"/tts/{key}.mp3", headers=etag)
+
+        self.assertEqual((post.status_code, get.status_code), (304, 304))
+        self.assertEqual(self.tts_client.speech.inputs, [])
+
+    def test_over_long_text_is_413(self):
+        response = self.client.post("/tts", json={"text": "平" * (MAX_TTS_CHARS + 1)})
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.tts_client.speech.inputs, [])
+
+    def test_unknown_or_malformed_audio_urls_are_404(self):
+        for path in (
+            f"/tts/{'0' * 64}.mp3",
+            f"/tts/{'0' * 64}.ogg",
+            "/tts/abc.mp3",
+            f"/tts/{'A' * 64}.mp3",
+            f"/tts/{'.' * 64}.mp3",
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_malformed_key_is_404_even_with_a_matching_etag(self):
+        key = "g" * 64
+
+        response = self.client.get(f"/tts/{key}.mp3", headers={"If-None-Match": f'"{key}"'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("etag", response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
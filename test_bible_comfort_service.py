@@ -1,9 +1,11 @@
+import asyncio
 import unittest
-import os
 import json
 from unittest.mock import patch
+from comfort_base import completed_items
 import bible_comfort_service as bible_comfort_service_module
 from bible_comfort_service import (
+    BatchNotFoundError,
     BibleComfortService,
     BibleComfortQuery,
     BibleComfortResponse,
@@ -12,37 +14,58 @@ from test_comfort_support import (
     FakeDuckDuckGoSearchProvider,
     FakeOpenAIClient,
     FakeSearchProvider,
+    RUN_LIVE_OPENAI,
+    live_openai_client,
 )
 
 
-@unittest.skipUnless(os.environ.get("OPENAI_API_KEY"), "OPENAI_API_KEY is not set, skipping BibleComfortService integration test.")
+@unittest.skipUnless(RUN_LIVE_OPENAI, "Set RUN_LIVE_OPENAI=1 and OPENAI_API_KEY to run the BibleComfortService integration test.")
 class TestBibleComfortServiceIntegration(unittest.TestCase):
-    def test_service_real_api_call_zh(self):
-        service = BibleComfortService()
-        query = BibleComfortQuery(
-            language="zh",
-            situation="近期情绪低落，难以入睡",
-            max_passages=1,
-        )
-        result = service.get_comfort(query)
-        try:
-            response_obj = BibleComfortResponse(**result)
-        except Exception as e:
-            self.fail(f"Service response did not match ComfortResponse: {e}")
-        print(response_obj)
-        self.assertGreaterEqual(len(response_obj.passages), 1)
-        self.assertTrue(len(response_obj.devotional) > 10)
-        self.assertTrue(len(response_obj.prayer) > 10)
+    @classmethod
+    def setUpClass(cls):
+        # One client and one event loop for the class, so later tests reuse the pooled
+        # keep-alive connections; a client shared across asyncio.run loops would not.
+        cls.loop = asyncio.new_event_loop()
+        cls.client = live_openai_client()
+        cls.service = BibleComfortService(openai_client=cls.client)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.run_until_complete(cls.client.close())
+        cls.loop.close()
+
+    def test_service_real_api_call_zh_and_en(self):
+        # Both probes in flight at once: the run waits for the slower reply, not the sum.
+        service = self.service
+        # (query, count words instead of characters, minimum devotional length, minimum prayer length)
+        cases = [
+            (BibleComfortQuery(language="zh", situation="近期情绪低落，难以入睡", max_passages=1), False, 10, 10),
+            (BibleComfortQuery(language="en", situation="Struggling with uncertainty at work", max_passages=1), True, 10, 5),
+        ]
+
+        async def ask_all():
+            return await asyncio.gather(*(service.get_comfort(case[0]) for case in cases))
+
+        for (query, by_words, min_devotional, min_prayer), result in zip(cases, self.loop.run_until_complete(ask_all())):
+            with self.subTest(language=query.language):
+                try:
+                    response_obj = BibleComfortResponse(**result)
+                except Exception as e:
+                    self.fail(f"Service response did not match ComfortResponse: {e}")
+                length = (lambda text: len(text.split())) if by_words else len
+                self.assertEqual(len(response_obj.passages), 1)
+                self.assertGreater(length(response_obj.devotional), min_devotional)
+                self.assertGreater(length(response_obj.prayer), min_prayer)
 
     def test_service_real_api_call_zh_search(self):
-        service = BibleComfortService()
+        service = self.service
         query = BibleComfortQuery(
             language="zh",
             situation="最近有很多公司宣称因为AI而layoff员工, 比如meta, block, amazon. 这让人对工作感到不确定和焦虑",
             max_passages=3,
             enable_web_search=True,
         )
-        result = service.get_comfort(query)
+        result = self.loop.run_until_complete(service.get_comfort(query))
         try:
             response_obj = BibleComfortResponse(**result)
         except Exception as e:
@@ -54,21 +77,24 @@ class TestBibleComfortServiceIntegration(unittest.TestCase):
         print(response_obj.prayer)
         self.assertTrue(len(response_obj.prayer) > 10)
 
-    def test_service_real_api_call_en(self):
-        service = BibleComfortService()
-        query = BibleComfortQuery(
-            language="en",
-            situation="Struggling with uncertainty at work",
-            max_passages=1,
+
+class TestBibleComfortServiceCannedReply(unittest.TestCase):
+    def test_get_comfort_returns_response_model_shape_for_zh(self):
+        passage = {"ref": "诗篇 23:1", "short_quote": "耶和华是我的牧者", "reason": "r", "full_passage_text": "t"}
+        fake_client = FakeOpenAIClient(
+            json.dumps({"passages": [passage, passage], "devotional": "安慰的话", "prayer": "祷告"})
         )
-        result = service.get_comfort(query)
-        try:
-            response_obj = BibleComfortResponse(**result)
-        except Exception as e:
-            self.fail(f"Service response did not match ComfortResponse: {e}")
+        service = BibleComfortService(openai_client=fake_client, search_provider=FakeSearchProvider(""))
+
+        result = asyncio.run(
+            service.get_comfort(BibleComfortQuery(language="zh", situation="近期情绪低落，难以入睡", max_passages=1))
+        )
+
+        response_obj = BibleComfortResponse(**result)
         self.assertEqual(len(response_obj.passages), 1)
-        self.assertTrue(len(response_obj.devotional.split()) > 10)
-        self.assertTrue(len(response_obj.prayer.split()) > 5)
+        self.assertTrue(response_obj.devotional)
+        self.assertTrue(response_obj.prayer)
+        self.assertTrue(response_obj.disclaimer)
 
 
 class TestBibleComfortServiceSearchContext(unittest.TestCase):
@@ -93,10 +119,12 @@ class TestBibleComfortServiceSearchContext(unittest.TestCase):
             search_provider=search_provider,
         )
 
-        service.get_comfort(
-            BibleComfortQuery(
-                language="en",
-                situation="I feel anxious about work.",
+        asyncio.run(
+            service.get_comfort(
+                BibleComfortQuery(
+                    language="en",
+                    situation="I feel anxious about work.",
+                )
             )
         )
 
@@ -139,11 +167,13 @@ class TestBibleComfortServiceSearchContext(unittest.TestCase):
         ):
             service = BibleComfortService(openai_client=fake_client)
 
-            service.get_comfort(
-                BibleComfortQuery(
-                    language="en",
-                    situation="I feel anxious about layoffs at work.",
-                    enable_web_search=True,
+            asyncio.run(
+                service.get_comfort(
+                    BibleComfortQuery(
+                        language="en",
+                        situation="I feel anxious about layoffs at work.",
+                        enable_web_search=True,
+                    )
                 )
             )
 
@@ -228,10 +258,12 @@ class TestBibleComfortServiceSearchContext(unittest.TestCase):
         fake_client = FakeOpenAIClient(response_payload)
         service = BibleComfortService(openai_client=fake_client)
 
-        result = service.get_comfort(
-            BibleComfortQuery(
-                language="en",
-                situation="I feel numb after a painful setback.",
+        result = asyncio.run(
+            service.get_comfort(
+                BibleComfortQuery(
+                    language="en",
+                    situation="I feel numb after a painful setback.",
+                )
             )
         )
 
@@ -306,14 +338,16 @@ class TestBibleComfortServiceSearchContext(unittest.TestCase):
         service = BibleComfortService(
             openai_client=fake_client,
         )
-        result = service._search_with_openai_web(
-            fake_client,
-            BibleComfortQuery(
-                language="en",
-                situation="I feel anxious at night and cannot sleep.",
-                guidance="Focus on biblical comfort for insomnia.",
-                enable_web_search=True,
-            ),
+        result = asyncio.run(
+            service._search_with_openai_web(
+                fake_client,
+                BibleComfortQuery(
+                    language="en",
+                    situation="I feel anxious at night and cannot sleep.",
+                    guidance="Focus on biblical comfort for insomnia.",
+                    enable_web_search=True,
+                ),
+            )
         )
 
         self.assertEqual(fake_client.responses.last_kwargs["tools"], [{"type": "web_search"}])
@@ -376,10 +410,12 @@ class TestBibleComfortServiceSearchContext(unittest.TestCase):
             openai_client=fake_client,
         )
 
-        service.get_comfort(
-            BibleComfortQuery(
-                language="en",
-                situation="I feel overwhelmed.",
+        asyncio.run(
+            service.get_comfort(
+                BibleComfortQuery(
+                    language="en",
+                    situation="I feel overwhelmed.",
+                )
             )
         )
 
@@ -387,5 +423,203 @@ class TestBibleComfortServiceSearchContext(unittest.TestCase):
         self.assertNotIn("Web search findings:", prompt)
 
 
+    def test_stream_comfort_yields_response_text_incrementally(self):
+        response_payload = json.dumps({"passages": [], "devotional": "Comfort"})
+        fake_client = FakeOpenAIClient(response_payload)
+        service = BibleComfortService(
+            openai_client=fake_client,
+            search_provider=FakeSearchProvider(""),
+        )
+
+        async def collect():
+            query = BibleComfortQuery(language="en", situation="I feel overwhelmed.")
+            return [delta async for delta in service.stream_comfort(query)]
+
+        deltas = asyncio.run(collect())
+
+        self.assertTrue(fake_client.completions.last_kwargs["stream"])
+        self.assertEqual(len(deltas), 2)
+        self.assertEqual("".join(deltas), response_payload)
+
+    def test_completed_items_only_reports_passages_the_model_has_moved_past(self):
+        first = '{"passages": [{"ref": "Psalm 23:1", "short_quote": "The LORD is my shepherd"}'
+
+        self.assertEqual(completed_items(first, "passages"), [])
+        self.assertEqual(
+            completed_items(first + ', {"ref": "Psa', "passages"),
+            [{"ref": "Psalm 23:1", "short_quote": "The LORD is my shepherd"}],
+        )
+        self.assertEqual(len(completed_items(first + '], "devotional": "Com', "passages")), 1)
+        self.assertEqual(completed_items('{"devotional": "Comfort"', "passages"), [])
+
+    def test_finalize_response_drops_short_quotes_over_word_limit(self):
+        service = BibleComfortService(
+            openai_client=FakeOpenAIClient("{}"),
+            search_provider=FakeSearchProvider(""),
+        )
+        twenty_words = " ".join(["a"] * 20)
+        passage = {"reason": "r", "full_passage_text": "t"}
+        content = json.dumps(
+            {
+                "passages": [
+                    {"ref": "Psalm 23:1", "short_quote": twenty_words, **passage},
+                    {"ref": "Psalm 46:1", "short_quote": twenty_words + " a", **passage},
+                ]
+            }
+        )
+
+        result = service._finalize_response(
+            BibleComfortResponse.model_validate_json(content),
+            BibleComfortQuery(language="en", situation="s"),
+        )
+
+        self.assertEqual(result["passages"][0]["short_quote"], twenty_words)
+        self.assertEqual(result["passages"][1]["short_quote"], "")
+        self.assertTrue(result["disclaimer"])
+
+    def test_get_comfort_requests_strict_json_schema_for_the_response_model(self):
+        fake_client = FakeOpenAIClient(json.dumps({"passages": [], "devotional": "Comfort"}))
+        service = BibleComfortService(openai_client=fake_client, search_provider=FakeSearchProvider(""))
+
+        asyncio.run(service.get_comfort(BibleComfortQuery(language="en", situation="s")))
+
+        response_format = fake_client.completions.last_kwargs["response_format"]
+        self.assertEqual(response_format["type"], "json_schema")
+        self.assertTrue(response_format["json_schema"]["strict"])
+        schema = response_format["json_schema"]["schema"]
+        self.assertEqual(schema["required"], list(BibleComfortResponse.model_fields))
+        self.assertFalse(schema["$defs"]["BiblePassage"]["additionalProperties"])
+
+    def test_get_comfort_rejects_reply_that_does_not_match_schema(self):
+        service = BibleComfortService(
+            openai_client=FakeOpenAIClient(json.dumps({"passages": [{"short_quote": "missing ref"}]})),
+            search_provider=FakeSearchProvider(""),
+        )
+
+        with self.assertRaises(ValueError):
+            asyncio.run(service.get_comfort(BibleComfortQuery(language="en", situation="s")))
+
+
+
+class _FakeBatchFiles:
+    def __init__(self, output_text: str):
+        self.output_text = output_text
+        self.uploaded = None
+
+    async def create(self, file, purpose):
+        self.uploaded = {"file": file, "purpose": purpose}
+        return type("FileObject", (), {"id": "file-in"})()
+
+    async def content(self, file_id):
+        return type("FileContent", (), {"text": self.output_text})()
+
+
+class _FakeBatches:
+    def __init__(self, status: str, metadata=None):
+        self.status = status
+        self.metadata = {"source": "bible-comfort"} if metadata is None else metadata
+        self.created = None
+
+    async def create(self, **kwargs):
+        self.created = kwargs
+        return type("Batch", (), {"id": "batch-1", "status": "validating"})()
+
+    async def retrieve(self, batch_id):
+        return type(
+            "Batch", (), {"id": batch_id, "status": self.status, "output_file_id": "file-out", "metadata": self.metadata}
+        )()
+
+
+class TestBibleComfortServiceBatch(unittest.TestCase):
+    def _service(self, output_text: str = "", status: str = "completed", metadata=None):
+        fake_client = FakeOpenAIClient("{}")
+        fake_client.files = _FakeBatchFiles(output_text)
+        fake_client.batches = _FakeBatches(status, metadata)
+        service = BibleComfortService(openai_client=fake_client, search_provider=FakeSearchProvider(""))
+        return service, fake_client
+
+    def test_submit_batch_uploads_one_chat_request_per_query(self):
+        service, fake_client = self._service()
+
+        batch = asyncio.run(
+            service.submit_batch(
+                [
+                    BibleComfortQuery(language="zh", situation="失眠"),
+                    BibleComfortQuery(language="en", situation="Lonely", max_passages=1),
+                ]
+            )
+        )
+
+        name, payload = fake_client.files.uploaded["file"]
+        lines = [json.loads(line) for line in payload.decode("utf-8").splitlines()]
+        self.assertEqual(batch["id"], "batch-1")
+        self.assertEqual(fake_client.files.uploaded["purpose"], "batch")
+        self.assertEqual(fake_client.batches.created["completion_window"], "24h")
+        self.assertEqual(fake_client.batches.created["metadata"], {"source": "bible-comfort"})
+        self.assertEqual([line["custom_id"] for line in lines], ["0:3:zh", "1:1:en"])
+        self.assertEqual(lines[0]["url"], "/v1/chat/completions")
+        self.assertIn("失眠", lines[0]["body"]["messages"][1]["content"])
+
+    def test_get_batch_parses_completed_output_in_order(self):
+        answer = {
+            "passages": [
+                {"ref": "Psalm 23:1", "short_quote": "", "reason": "r", "full_passage_text": "t"},
+                {"ref": "Psalm 46:1", "short_quote": "", "reason": "r", "full_passage_text": "t"},
+            ],
+            "devotional": "Comfort",
+            "prayer": "Prayer",
+        }
+        output_text = "\n".join(
+            [
+                json.dumps({"custom_id": "1:1:en", "error": {"message": "boom"}}),
+                json.dumps(
+                    {
+                        "custom_id": "0:1:en",
+                        "response": {"body": {"choices": [{"message": {"content": json.dumps(answer)}}]}},
+                    }
+                ),
+            ]
+        )
+        service, _ = self._service(output_text)
+
+        batch = asyncio.run(service.get_batch("batch-1"))
+
+        self.assertEqual(batch["status"], "completed")
+        self.assertEqual([result["index"] for result in batch["results"]], [0, 1])
+        first = BibleComfortResponse(**batch["results"][0]["response"])
+        self.assertEqual(len(first.passages), 1)
+        self.assertTrue(first.disclaimer)
+        self.assertIsNone(batch["results"][1]["response"])
+        self.assertEqual(batch["results"][1]["error"], "boom")
+
+    def test_get_batch_rejects_batches_it_did_not_create(self):
+        for metadata in ({}, {"source": "devotional-backfill"}):
+            with self.subTest(metadata=metadata):
+                service, _ = self._service(metadata=metadata)
+
+                with self.assertRaises(BatchNotFoundError):
+                    asyncio.run(service.get_batch("batch-1"))
+
+    def test_get_batch_skips_rows_with_foreign_custom_ids(self):
+        output_text = "\n".join(
+            [
+                json.dumps({"custom_id": "2026-02-16", "response": None}),
+                json.dumps({"custom_id": "0:1:en", "error": {"message": "boom"}}),
+            ]
+        )
+        service, _ = self._service(output_text)
+
+        batch = asyncio.run(service.get_batch("batch-1"))
+
+        self.assertEqual(batch["results"], [{"index": 0, "response": None, "error": "boom"}])
+
+    def test_get_batch_returns_no_results_while_in_progress(self):
+        service, _ = self._service(status="in_progress")
+
+        batch = asyncio.run(service.get_batch("batch-1"))
+
+        self.assertEqual(batch, {"id": "batch-1", "status": "in_progress", "results": []})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import unittest
+
+from bible_comfort_service import BibleComfortQuery, BibleComfortService
+from combined_comfort_service import CombinedComfortService
+from philosophy_comfort_service import PhilosophyComfortService
+from test_comfort_support import FakeOpenAIClient, FakeSearchProvider
+
+
+class TestCombinedComfortService(unittest.TestCase):
+    def _service(self, response_payload: str):
+        fake_client = FakeOpenAIClient(response_payload)
+        bible = BibleComfortService(openai_client=fake_client, search_provider=FakeSearchProvider(""))
+        philosophy = PhilosophyComfortService(openai_client=fake_client, search_provider=FakeSearchProvider(""))
+        return CombinedComfortService(bible, philosophy), fake_client
+
+    def test_get_combined_makes_one_call_and_splits_the_reply(self):
+        response_payload = json.dumps(
+            {
+                "bible": {
+                    "passages": [
+                        {"ref": "Psalm 23:1", "short_quote": "", "reason": "r", "full_passage_text": "t"},
+                        {"ref": "Psalm 46:1", "short_quote": "", "reason": "r", "full_passage_text": "t"},
+                    ],
+                    "devotional": "Comfort",
+                    "prayer": "Prayer",
+                },
+                "philosophy": {"reflection": "Reflection", "exercise": "Exercise"},
+            }
+        )
+        service, fake_client = self._service(response_payload)
+
+        result = asyncio.run(
+            service.get_combined(BibleComfortQuery(language="en", situation="I feel lost.", max_passages=1))
+        )
+
+        messages = fake_client.completions.last_kwargs["messages"]
+        self.assertIn("--- ROLE 2 ---", messages[0]["content"])
+        self.assertIn("I feel lost.", messages[1]["content"])
+        self.assertEqual(len(result["bible"]["passages"]), 1)
+        self.assertTrue(result["bible"]["disclaimer"])
+        self.assertEqual(result["philosophy"]["reflection"], "Reflection")
+        self.assertTrue(result["philosophy"]["disclaimer"])
+
+    def test_search_findings_appear_once_with_both_usage_notes(self):
+        service, _ = self._service("{}")
+
+        prompt = service.build_messages(BibleComfortQuery(language="en", situation="s"), "Layoffs at Acme")[1]["content"]
+
+        self.assertEqual(prompt.count("Layoffs at Acme"), 1)
+        self.assertEqual(prompt.count("Web search findings"), 1)
+        self.assertIn(service.bible_service.search_usage_note, prompt)
+        self.assertIn(service.philosophy_service.search_usage_note, prompt)
+        self.assertLess(prompt.index("--- ROLE 2 task:"), prompt.index("Web search findings"))
+
+    def test_get_combined_rejects_non_json_reply(self):
+        service, _ = self._service("not json")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(service.get_combined(BibleComfortQuery(language="en", situation="s")))
+
+
+if __name__ == "__main__":
+    unittest.main()
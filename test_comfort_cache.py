@@ -0,0 +1,106 @@
+import asyncio
+import json
+import unittest
+
+from bible_comfort_service import BibleComfortQuery, BibleComfortService
+from comfort_cache import LLMCache, cache_key
+from test_comfort_support import FakeOpenAIClient, FakeSearchProvider
+
+
+def _fake_embedder(vectors):
+    async def embed(text):
+        return vectors[text]
+
+    return embed
+
+
+class LLMCacheTest(unittest.TestCase):
+    def test_cache_key_is_stable_and_sensitive_to_messages(self):
+        messages = [{"role": "user", "content": "平安"}]
+
+        self.assertEqual(cache_key("m", messages), cache_key("m", list(messages)))
+        self.assertNotEqual(
+            cache_key("m", messages),
+            cache_key("m", [{"role": "user", "content": "peace"}]),
+        )
+
+    def test_returns_exact_match(self):
+        cache = LLMCache()
+
+        async def run():
+            await cache.set("key", {"devotional": "Comfort"})
+            return await cache.get("key"), await cache.get("other")
+
+        hit, miss = asyncio.run(run())
+
+        self.assertEqual(hit, {"devotional": "Comfort"})
+        self.assertIsNone(miss)
+
+    def test_returns_semantic_match_within_scope_above_threshold(self):
+        cache = LLMCache(
+            embedder=_fake_embedder(
+                {
+                    "anxious about work": [1.0, 0.0],
+                    "worried about my job": [0.99, 0.05],
+                    "grieving a friend": [0.0, 1.0],
+                }
+            )
+        )
+
+        async def run():
+            await cache.set("a", {"devotional": "Work"}, text="anxious about work", scope="en")
+            return (
+                await cache.get("b", text="worried about my job", scope="en"),
+                await cache.get("c", text="worried about my job", scope="zh"),
+                await cache.get("d", text="grieving a friend", scope="en"),
+            )
+
+        similar, other_scope, unrelated = asyncio.run(run())
+
+        self.assertEqual(similar, {"devotional": "Work"})
+        self.assertIsNone(other_scope)
+        self.assertIsNone(unrelated)
+
+
+class BibleComfortServiceCacheTest(unittest.TestCase):
+    def test_get_comfort_serves_repeat_query_from_cache(self):
+        fake_client = FakeOpenAIClient(
+            json.dumps({"passages": [], "devotional": "Comfort", "prayer": "Prayer", "disclaimer": "D"})
+        )
+        service = BibleComfortService(
+            openai_client=fake_client,
+            search_provider=FakeSearchProvider(""),
+            cache=LLMCache(),
+        )
+        query = BibleComfortQuery(language="en", situation="I feel anxious about work.")
+
+        first = asyncio.run(service.get_comfort(query))
+        fake_client.completions.last_kwargs = None
+        second = asyncio.run(service.get_comfort(query))
+
+        self.assertIsNone(fake_client.completions.last_kwargs)
+        self.assertEqual(first, second)
+
+    def test_whitespace_and_case_variants_report_cache_hit(self):
+        fake_client = FakeOpenAIClient(
+            json.dumps({"passages": [], "devotional": "Comfort", "prayer": "Prayer", "disclaimer": "D"})
+        )
+        service = BibleComfortService(
+            openai_client=fake_client,
+            search_provider=FakeSearchProvider(""),
+            cache=LLMCache(),
+        )
+
+        _, first_hit = asyncio.run(
+            service.get_comfort_with_cache_status(BibleComfortQuery(language="en", situation="I feel anxious."))
+        )
+        _, second_hit = asyncio.run(
+            service.get_comfort_with_cache_status(BibleComfortQuery(language="en", situation="  i feel  ANXIOUS. "))
+        )
+
+        self.assertFalse(first_hit)
+        self.assertTrue(second_hit)
+
+
+if __name__ == "__main__":
+    unittest.main()
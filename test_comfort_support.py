@@ -1,6 +1,77 @@
+import contextlib
+import hashlib
+import json
+import os
+from pathlib import Path
+
 from comfort_search import DuckDuckGoSearchProvider
 
 
+# Tests against the real OpenAI API cost money and take seconds each, so they only run
+# when asked for explicitly: RUN_LIVE_OPENAI=1 with OPENAI_API_KEY set.
+RUN_LIVE_OPENAI = os.environ.get("RUN_LIVE_OPENAI") == "1" and bool(os.environ.get("OPENAI_API_KEY"))
+
+# Live replies are recorded here, so only the first run against a given prompt pays for it.
+# CI can keep the directory warm with actions/cache; OPENAI_TEST_CACHE_DIR="" disables recording.
+LIVE_CACHE_DIR = os.environ.get("OPENAI_TEST_CACHE_DIR", os.path.join(".cache", "openai-tests"))
+
+
+def _request_key(kwargs) -> str:
+    encoded = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _CachedStreamedSpeech:
+    def __init__(self, audio: bytes):
+        self.audio = audio
+
+    async def iter_bytes(self, chunk_size=None):
+        yield self.audio
+
+
+def live_openai_client(cache_dir=None):
+    """AsyncOpenAI client for the live tests, replaying recorded chat and TTS replies from disk."""
+    from openai import AsyncOpenAI
+    from openai.types.chat import ChatCompletion
+
+    client = AsyncOpenAI()
+    cache_dir = LIVE_CACHE_DIR if cache_dir is None else cache_dir
+    if not cache_dir:
+        return client
+    cache_path = Path(cache_dir)
+    cache_path.mkdir(parents=True, exist_ok=True)
+
+    create_completion = client.chat.completions.create
+
+    async def cached_create(**kwargs):
+        if kwargs.get("stream"):
+            return await create_completion(**kwargs)
+        path = cache_path / f"{_request_key(kwargs)}.json"
+        if path.exists():
+            return ChatCompletion.model_validate_json(path.read_text(encoding="utf-8"))
+        response = await create_completion(**kwargs)
+        path.write_text(response.model_dump_json(), encoding="utf-8")
+        return response
+
+    streaming_speech = client.audio.speech.with_streaming_response
+    create_speech = streaming_speech.create
+
+    @contextlib.asynccontextmanager
+    async def cached_speech(**kwargs):
+        path = cache_path / f"{_request_key(kwargs)}.bin"
+        if path.exists():
+            yield _CachedStreamedSpeech(path.read_bytes())
+            return
+        async with create_speech(**kwargs) as response:
+            audio = b"".join([chunk async for chunk in response.iter_bytes()])
+        path.write_bytes(audio)
+        yield _CachedStreamedSpeech(audio)
+
+    client.chat.completions.create = cached_create
+    streaming_speech.create = cached_speech
+    return client
+
+
 class FakeSearchProvider:
     def __init__(self, context: str):
         self.context = context
@@ -32,18 +103,38 @@ class FakeResponses:
         self.output_text = output_text
         self.last_kwargs = None
 
-    def create(self, **kwargs):
+    async def create(self, **kwargs):
         self.last_kwargs = kwargs
         return type("Response", (), {"output_text": self.output_text})()
 
 
+class FakeChunkStream:
+    def __init__(self, deltas):
+        self._deltas = list(deltas)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._deltas:
+            raise StopAsyncIteration
+        delta = type("Delta", (), {"content": self._deltas.pop(0)})()
+        choice = type("Choice", (), {"delta": delta})()
+        return type("Chunk", (), {"choices": [choice]})()
+
+
 class FakeCompletions:
     def __init__(self, response_content: str):
         self.response_content = response_content
         self.last_kwargs = None
 
-    def create(self, **kwargs):
+    async def create(self, **kwargs):
         self.last_kwargs = kwargs
+        if kwargs.get("stream"):
+            midpoint = len(self.response_content) // 2
+            return FakeChunkStream(
+                [self.response_content[:midpoint], None, self.response_content[midpoint:]]
+            )
         return type(
             "Response",
             (),
@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import openai
+
+from openai_calls import MAX_ATTEMPTS, create_chat_completion
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+class _FlakyCompletions:
+    def __init__(self, failures, response="ok"):
+        self.failures = list(failures)
+        self.calls = 0
+        self.response = response
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return self.response
+
+
+class _FakeClient:
+    def __init__(self, failures, response="ok"):
+        self.completions = _FlakyCompletions(failures, response)
+        self.chat = type("Chat", (), {"completions": self.completions})()
+
+
+class CreateChatCompletionTest(unittest.TestCase):
+    @patch("openai_calls.asyncio.sleep", new_callable=AsyncMock)
+    def test_retries_transient_errors_then_returns(self, sleep):
+        client = _FakeClient([_connection_error(), _connection_error()])
+
+        result = asyncio.run(create_chat_completion(client, model="m", messages=[]))
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(client.completions.calls, 3)
+        self.assertEqual(sleep.await_count, 2)
+
+    @patch("openai_calls.asyncio.sleep", new_callable=AsyncMock)
+    def test_gives_up_after_max_attempts(self, sleep):
+        client = _FakeClient([_connection_error() for _ in range(MAX_ATTEMPTS)])
+
+        with self.assertRaises(openai.APIConnectionError):
+            asyncio.run(create_chat_completion(client, model="m", messages=[]))
+
+        self.assertEqual(client.completions.calls, MAX_ATTEMPTS)
+
+    @patch("openai_calls.asyncio.sleep", new_callable=AsyncMock)
+    def test_does_not_retry_non_transient_errors(self, sleep):
+        client = _FakeClient([ValueError("bad request")])
+
+        with self.assertRaises(ValueError):
+            asyncio.run(create_chat_completion(client, model="m", messages=[]))
+
+        self.assertEqual(client.completions.calls, 1)
+        sleep.assert_not_awaited()
+
+    def test_logs_cached_prompt_token_ratio(self):
+        usage = SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=SimpleNamespace(cached_tokens=1536))
+        client = _FakeClient([], response=SimpleNamespace(usage=usage))
+
+        with self.assertLogs("openai_calls", level="INFO") as logs:
+            asyncio.run(create_chat_completion(client, model="m", messages=[]))
+
+        self.assertIn("1536/2000 prompt tokens cached (77%)", logs.output[0])
+
+
+
+class _FakeStream:
+    def __init__(self, items):
+        self.items = list(items)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+class StreamingPermitTest(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("openai_calls._semaphore", asyncio.Semaphore(1))
+        self.semaphore = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stream_holds_its_permit_until_exhausted(self):
+        client = _FakeClient([], response=_FakeStream(["a", "b"]))
+
+        async def consume():
+            stream = await create_chat_completion(client, model="m", messages=[], stream=True)
+            held = self.semaphore.locked()
+            items = [item async for item in stream]
+            return held, items
+
+        held, items = asyncio.run(consume())
+
+        self.assertTrue(held)
+        self.assertEqual(items, ["a", "b"])
+        self.assertFalse(self.semaphore.locked())
+
+    def test_closing_a_stream_early_returns_the_permit(self):
+        fake_stream = _FakeStream(["a", "b"])
+        client = _FakeClient([], response=fake_stream)
+
+        async def take_one():
+            stream = await create_chat_completion(client, model="m", messages=[], stream=True)
+            first = await stream.__anext__()
+            await stream.close()
+            return first
+
+        self.assertEqual(asyncio.run(take_one()), "a")
+        self.assertTrue(fake_stream.closed)
+        self.assertFalse(self.semaphore.locked())
+
+
+if __name__ == "__main__":
+    unittest.main()
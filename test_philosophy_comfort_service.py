@@ -1,5 +1,5 @@
+import asyncio
 import json
-import os
 import unittest
 from unittest.mock import patch
 import philosophy_comfort_service as philosophy_comfort_service_module
@@ -12,18 +12,21 @@ from philosophy_comfort_service import (
 from test_comfort_support import (
     FakeDuckDuckGoSearchProvider,
     FakeOpenAIClient,
+    RUN_LIVE_OPENAI,
+    live_openai_client,
 )
 
 
-@unittest.skipUnless(os.environ.get("OPENAI_API_KEY"), "OPENAI_API_KEY is not set, skipping PhilosophyComfortService integration test.")
+@unittest.skipUnless(RUN_LIVE_OPENAI, "Set RUN_LIVE_OPENAI=1 and OPENAI_API_KEY to run the PhilosophyComfortService integration test.")
 class TestPhilosophyComfortServiceIntegration(unittest.TestCase):
     def test_service_real_api_call_zh(self):
-        service = PhilosophyComfortService()
+        # Own client: the shared one's pooled connections would outlive each asyncio.run loop.
+        service = PhilosophyComfortService(openai_client=live_openai_client())
         query = PhilosophyComfortQuery(
             language="zh",
             situation="最近因为工作不稳定而感到焦虑",
         )
-        result = service.get_comfort(query)
+        result = asyncio.run(service.get_comfort(query))
         try:
             response_obj = PhilosophyComfortResponse(**result)
         except Exception as e:
@@ -47,10 +50,12 @@ class TestPhilosophyComfortServiceSearchContext(unittest.TestCase):
         )
         service = PhilosophyComfortService(openai_client=fake_client)
 
-        service.get_comfort(
-            PhilosophyComfortQuery(
-                language="en",
-                situation="I feel anxious about work.",
+        asyncio.run(
+            service.get_comfort(
+                PhilosophyComfortQuery(
+                    language="en",
+                    situation="I feel anxious about work.",
+                )
             )
         )
 
@@ -99,11 +104,13 @@ class TestPhilosophyComfortServiceSearchContext(unittest.TestCase):
         ):
             service = PhilosophyComfortService(openai_client=fake_client)
 
-            service.get_comfort(
-                PhilosophyComfortQuery(
-                    language="en",
-                    situation="I feel anxious about work.",
-                    enable_web_search=True,
+            asyncio.run(
+                service.get_comfort(
+                    PhilosophyComfortQuery(
+                        language="en",
+                        situation="I feel anxious about work.",
+                        enable_web_search=True,
+                    )
                 )
             )
 
@@ -164,10 +171,12 @@ class TestPhilosophyComfortServiceSearchContext(unittest.TestCase):
         fake_client = FakeOpenAIClient(response_payload)
         service = PhilosophyComfortService(openai_client=fake_client)
 
-        result = service.get_comfort(
-            PhilosophyComfortQuery(
-                language="en",
-                situation="I feel worn down after a long season of uncertainty.",
+        result = asyncio.run(
+            service.get_comfort(
+                PhilosophyComfortQuery(
+                    language="en",
+                    situation="I feel worn down after a long season of uncertainty.",
+                )
             )
         )
 
@@ -213,13 +222,15 @@ class TestPhilosophyComfortServiceSearchContext(unittest.TestCase):
         )
         service = PhilosophyComfortService(openai_client=fake_client)
 
-        result = service._search_with_openai_web(
-            fake_client,
-            PhilosophyComfortQuery(
-                language="en",
-                situation="I feel anxious about work.",
-                enable_web_search=True,
-            ),
+        result = asyncio.run(
+            service._search_with_openai_web(
+                fake_client,
+                PhilosophyComfortQuery(
+                    language="en",
+                    situation="I feel anxious about work.",
+                    enable_web_search=True,
+                ),
+            )
         )
 
         self.assertEqual(fake_client.responses.last_kwargs["tools"], [{"type": "web_search"}])
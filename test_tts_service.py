@@ -1,63 +1,359 @@
+import asyncio
+import io
 import unittest
 import os
-import shutil
-import subprocess
+import tempfile
 import time
-from tts_service import TTSService
-from openai import OpenAI
+import wave
+from tts_service import MAX_TTS_CHARS, TextTooLongError, TTSCache, TTSRequest, TTSService, load_phrases
+from test_comfort_support import RUN_LIVE_OPENAI, live_openai_client
 
-if __name__ == '__main__':
-    unittest.main()
 
+async def _collect(stream):
+    return b"".join([chunk async for chunk in stream])
 
-@unittest.skipUnless(os.environ.get("OPENAI_API_KEY"), "OPENAI_API_KEY is not set, skipping TTS integration test.")
-class TestTTSGenerationIntegration(unittest.TestCase):
-    def test_generate_tts_audio_mp3_real(self):
-        client = OpenAI()  # uses env OPENAI_API_KEY
-        service = TTSService(openai_client=client)
-        tmp_path = None
-        try:
-            start = time.perf_counter()
-            tmp_path, media_type = service.generate_audio(
-                text="This is a short devotional audio test.",
-                language="en",
-                voice=None,
-                fmt="mp3",
+
+class _FakeStreamedSpeech:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def iter_bytes(self, chunk_size=None):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class _FakeSpeech:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.last_kwargs = None
+        self.inputs = []
+        self.with_streaming_response = self
+
+    def create(self, **kwargs):
+        self.last_kwargs = kwargs
+        self.inputs.append(kwargs["input"])
+        return _FakeStreamedSpeech(self.chunks)
+
+
+class _FakeTTSClient:
+    def __init__(self, chunks):
+        self.speech = _FakeSpeech(chunks)
+        self.audio = type("Audio", (), {"speech": self.speech})()
+
+
+class TestTTSServiceStreaming(unittest.TestCase):
+    def test_generate_audio_streams_chunks_in_requested_format(self):
+        client = _FakeTTSClient([b"RIFF", b"data"])
+        service = TTSService(openai_client=client)
+
+        audio = asyncio.run(_collect(service.generate_audio("愿你平安。", language="zh", fmt="WAV")))
+
+        self.assertEqual(audio, b"RIFFdata")
+        self.assertEqual(client.speech.last_kwargs["response_format"], "wav")
+        self.assertEqual(service.resolve_format("WAV"), ("wav", "audio/wav"))
+        self.assertEqual(service.resolve_format("ogg"), ("mp3", "audio/mpeg"))
+        self.assertEqual(service.resolve_format("opus"), ("opus", "audio/ogg"))
+        self.assertEqual(service.resolve_format("PCM"), ("pcm", "audio/wav"))
+
+    def test_long_text_is_synthesized_in_sentence_groups_in_order(self):
+        client = _FakeTTSClient([b"ID3"])
+        service = TTSService(openai_client=client)
+        text = " ".join(f"Sentence number {i} is here." for i in range(30))
+
+        audio = asyncio.run(_collect(service.generate_audio(text, language="en")))
+
+        self.assertEqual(client.speech.inputs[0], "Sentence number 0 is here.")
+        self.assertGreater(len(client.speech.inputs), 2)
+        self.assertEqual(" ".join(client.speech.inputs), text)
+        self.assertEqual(audio, b"ID3" * len(client.speech.inputs))
+
+    def test_long_opus_is_synthesized_in_one_request(self):
+        client = _FakeTTSClient([b"OggS"])
+        service = TTSService(openai_client=client)
+        text = " ".join(f"Sentence number {i} is here." for i in range(30))
+
+        audio = asyncio.run(_collect(service.generate_audio(text, language="en", fmt="opus")))
+
+        self.assertEqual(audio, b"OggS")
+        self.assertEqual(client.speech.inputs, [text])
+        self.assertEqual(client.speech.last_kwargs["response_format"], "opus")
+
+    def test_long_wav_is_one_header_followed_by_pcm(self):
+        client = _FakeTTSClient([b"\x00\x00"])
+        service = TTSService(openai_client=client)
+        text = "愿你平安。" * 100
+
+        audio = asyncio.run(_collect(service.generate_audio(text, language="zh", fmt="wav")))
+
+        self.assertEqual(client.speech.last_kwargs["response_format"], "pcm")
+        self.assertEqual(audio.count(b"RIFF"), 1)
+        with wave.open(io.BytesIO(audio[:44])) as wav:
+            self.assertEqual((wav.getframerate(), wav.getsampwidth(), wav.getnchannels()), (24000, 2, 1))
+        self.assertEqual(len(audio), 44 + 2 * len(client.speech.inputs))
+
+    def test_pcm_is_served_behind_a_streaming_wav_header(self):
+        for text in ("愿你平安。", "愿你平安。" * 100):
+            with self.subTest(chars=len(text)):
+                client = _FakeTTSClient([b"\x00\x00"])
+                service = TTSService(openai_client=client)
+
+                audio = asyncio.run(_collect(service.generate_audio(text, language="zh", fmt="pcm")))
+
+                self.assertEqual(client.speech.last_kwargs["response_format"], "pcm")
+                self.assertEqual(audio.count(b"RIFF"), 1)
+                with wave.open(io.BytesIO(audio[:44])) as wav:
+                    self.assertEqual((wav.getframerate(), wav.getsampwidth(), wav.getnchannels()), (24000, 2, 1))
+                self.assertEqual(len(audio), 44 + 2 * len(client.speech.inputs))
+
+    def test_generate_audio_bytes_returns_clip_and_media_type(self):
+        service = TTSService(openai_client=_FakeTTSClient([b"ID3", b"data"]))
+
+        self.assertEqual(asyncio.run(service.generate_audio_bytes("愿你平安。")), (b"ID3data", "audio/mpeg"))
+
+    def test_generate_audio_rejects_blank_text(self):
+        service = TTSService(openai_client=_FakeTTSClient([]))
+
+        with self.assertRaises(ValueError):
+            asyncio.run(_collect(service.generate_audio("   ")))
+
+    def test_generate_audio_rejects_oversize_text_before_calling_the_api(self):
+        client = _FakeTTSClient([b"ID3"])
+        service = TTSService(openai_client=client)
+
+        with self.assertRaises(TextTooLongError):
+            asyncio.run(_collect(service.generate_audio("平" * (MAX_TTS_CHARS + 1))))
+        self.assertEqual(client.speech.inputs, [])
+
+
+class TestTTSCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_write_through_stores_audio_under_content_key(self):
+        cache = TTSCache(self.tmp.name)
+        service = TTSService(openai_client=_FakeTTSClient([b"ID3", b"data"]))
+        key = service.cache_key("愿你平安。", "zh", None, "mp3")
+
+        self.assertIsNone(cache.get(key, "mp3"))
+        audio = asyncio.run(_collect(cache.write_through(key, "mp3", service.generate_audio("愿你平安。", language="zh"))))
+
+        self.assertEqual(audio, b"ID3data")
+        self.assertEqual(cache.get(key, "mp3").read_bytes(), b"ID3data")
+        self.assertEqual(key, service.cache_key("愿你平安。", "zh", "fable", "mp3"))
+        self.assertNotEqual(key, service.cache_key("愿你平安。", "zh", None, "wav"))
+
+    def test_generate_many_fills_the_cache_and_reports_failures_in_order(self):
+        cache = TTSCache(self.tmp.name)
+        client = _FakeTTSClient([b"ID3", b"data"])
+        service = TTSService(openai_client=client)
+        requests = [TTSRequest(text="愿你平安。"), TTSRequest(text="   "), TTSRequest(text="Peace", language="en")]
+
+        first = asyncio.run(service.generate_many(cache, requests))
+        client.speech.last_kwargs = None
+        second = asyncio.run(service.generate_many(cache, requests[:1]))
+
+        self.assertEqual(first[0].read_bytes(), b"ID3data")
+        self.assertIsInstance(first[1], ValueError)
+        self.assertEqual(first[2].read_bytes(), b"ID3data")
+        self.assertNotEqual(first[0], first[2])
+        self.assertEqual(second, [first[0]])
+        self.assertIsNone(client.speech.last_kwargs)
+
+    def test_concurrent_streams_of_one_entry_share_a_synthesis(self):
+        cache = TTSCache(self.tmp.name)
+        calls = []
+
+        async def synthesize():
+            calls.append(1)
+            for chunk in (b"ID3", b"data"):
+                await asyncio.sleep(0)
+                yield chunk
+
+        async def two_listeners():
+            return await asyncio.gather(
+                _collect(cache.stream("k", "mp3", synthesize)), _collect(cache.stream("k", "mp3", synthesize))
             )
-            elapsed = time.perf_counter() - start
-            self.assertTrue(os.path.exists(tmp_path), "Temp audio file should exist")
-            self.assertEqual(media_type, "audio/mpeg")
-            self.assertGreater(os.path.getsize(tmp_path), 128, "MP3 file should have content")
-            print(f"TTS MP3 generation took {elapsed:.2f}s")
-        finally:
-            if tmp_path and os.path.exists(tmp_path):
-                # play the audio with mpg123
-                try:
-                    if shutil.which("mpg123"):
-                        subprocess.run(["mpg123", "-q", tmp_path], check=False, timeout=5)
-                    else:
-                        print("mpg123 not found; skipping playback")
-                except Exception as e:
-                    print(f"mpg123 playback skipped: {e}")
-
-    def test_generate_tts_audio_wav_real(self):
-        client = OpenAI()
-        service = TTSService(openai_client=client)
-        tmp_path = None
-        try:
-            tmp_path, media_type = service.generate_audio(
-                text="这是一个中文语音测试。愿你平安。",
-                language="zh",
-                voice=None,
-                fmt="wav",
+
+        self.assertEqual(asyncio.run(two_listeners()), [b"ID3data", b"ID3data"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get("k", "mp3").read_bytes(), b"ID3data")
+
+    def test_stream_failure_reaches_every_listener(self):
+        cache = TTSCache(self.tmp.name)
+
+        async def synthesize():
+            yield b"ID3"
+            raise RuntimeError("upstream failed")
+
+        async def two_listeners():
+            return await asyncio.gather(
+                _collect(cache.stream("k", "mp3", synthesize)),
+                _collect(cache.stream("k", "mp3", synthesize)),
+                return_exceptions=True,
             )
-            self.assertTrue(os.path.exists(tmp_path))
-            self.assertEqual(media_type, "audio/wav")
-            self.assertGreater(os.path.getsize(tmp_path), 128, "WAV file should have content")
-        finally:
-            if tmp_path and os.path.exists(tmp_path):
-                print(tmp_path)
-                # os.remove(tmp_path)
 
+        results = asyncio.run(two_listeners())
+
+        self.assertEqual([type(r) for r in results], [RuntimeError, RuntimeError])
+        self.assertIsNone(cache.get("k", "mp3"))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_cancelled_synthesis_is_an_error_for_listeners_not_a_short_clip(self):
+        cache = TTSCache(self.tmp.name)
+
+        async def synthesize():
+            yield b"ID3"
+            await asyncio.sleep(10)
+            yield b"rest"
+
+        async def listen_then_cancel():
+            listener = asyncio.ensure_future(_collect(cache.stream("k", "mp3", synthesize)))
+            await asyncio.sleep(0.01)
+            cache._inflight["k.mp3"].task.cancel()
+            return await asyncio.gather(listener, return_exceptions=True)
+
+        [result] = asyncio.run(listen_then_cancel())
+
+        self.assertIsInstance(result, RuntimeError)
+        self.assertIsNone(cache.get("k", "mp3"))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_warm_cache_pins_phrases_against_eviction(self):
+        cache = TTSCache(self.tmp.name, max_bytes=4)
+        service = TTSService(openai_client=_FakeTTSClient([b"ID3", b"data"]))
+        phrases = load_phrases(os.path.join(os.path.dirname(__file__), "tts_phrases.json"))
+
+        warmed = asyncio.run(service.warm_cache(cache, phrases))
+        asyncio.run(service.generate_many(cache, [TTSRequest(text="Not pinned.", language="en")]))
+
+        self.assertTrue(all(path.exists() for path in warmed))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), sorted(path.name for path in warmed))
+
+    def test_warm_cache_only_synthesizes_phrases_not_yet_cached(self):
+        cache = TTSCache(self.tmp.name)
+        client = _FakeTTSClient([b"ID3"])
+        service = TTSService(openai_client=client)
+        phrases = [TTSRequest(text="Amen.", language="en"), TTSRequest(text="Peace be with you.", language="en")]
+
+        asyncio.run(service.generate_many(cache, phrases[:1]))
+        warmed = asyncio.run(service.warm_cache(cache, phrases))
+
+        self.assertEqual(client.speech.inputs, ["Amen.", "Peace be with you."])
+        self.assertEqual(len(warmed), 1)
+        self.assertEqual(len(cache.pinned), 2)
+
+    def test_try_lock_admits_one_holder_at_a_time(self):
+        cache = TTSCache(self.tmp.name)
+
+        with cache.try_lock("warm") as first:
+            with cache.try_lock("warm") as second:
+                self.assertEqual((first, second), (True, False))
+        with cache.try_lock("warm") as again:
+            self.assertTrue(again)
+
+    def test_evicts_oldest_entries_past_max_bytes(self):
+        cache = TTSCache(self.tmp.name, max_bytes=6)
+
+        async def chunks(data):
+            yield data
 
- 
+        asyncio.run(_collect(cache.write_through("old", "mp3", chunks(b"aaaa"))))
+        os.utime(cache.path_for("old", "mp3"), (0, 0))
+        asyncio.run(_collect(cache.write_through("new", "mp3", chunks(b"bbbb"))))
+
+        self.assertIsNone(cache.get("old", "mp3"))
+        self.assertIsNotNone(cache.get("new", "mp3"))
+
+    def test_eviction_removes_part_files_abandoned_by_a_killed_process(self):
+        cache = TTSCache(self.tmp.name)
+        abandoned = os.path.join(self.tmp.name, "abandoned.part")
+        in_progress = os.path.join(self.tmp.name, "in-progress.part")
+        for path in (abandoned, in_progress):
+            open(path, "wb").close()
+        os.utime(abandoned, (0, 0))
+
+        async def chunks():
+            yield b"ID3"
+
+        asyncio.run(_collect(cache.write_through("k", "mp3", chunks())))
+
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["in-progress.part", "k.mp3"])
+
+
+def _tiny_wav():
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b"\x00\x00" * 200)
+    return buffer.getvalue()
+
+
+# Canned audio for the offline generation tests: an ID3-tagged MP3 blob and a real, tiny WAV.
+_TINY_MP3 = b"ID3\x04\x00\x00\x00\x00\x00\x00" + b"\xff\xfb\x90\x00" + b"\x00" * 400
+_TINY_WAV = _tiny_wav()
+
+
+class TestTTSGeneration(unittest.TestCase):
+    def _generate(self, audio, **kwargs):
+        # Split in two so the test also covers chunk reassembly.
+        client = _FakeTTSClient([audio[:64], audio[64:]])
+        service = TTSService(openai_client=client)
+        return asyncio.run(_collect(service.generate_audio(**kwargs))), client
+
+    def test_generate_tts_audio(self):
+        cases = [
+            ("mp3", _TINY_MP3, "en", "This is a short devotional audio test."),
+            ("wav", _TINY_WAV, "zh", "这是一个中文语音测试。愿你平安。"),
+        ]
+        for fmt, canned, language, text in cases:
+            with self.subTest(fmt=fmt):
+                audio, client = self._generate(canned, text=text, language=language, voice=None, fmt=fmt)
+
+                self.assertEqual(audio, canned)
+                self.assertGreater(len(audio), 128, f"{fmt} stream should have content")
+                self.assertEqual(client.speech.last_kwargs["response_format"], fmt)
+
+
+@unittest.skipUnless(RUN_LIVE_OPENAI, "Set RUN_LIVE_OPENAI=1 and OPENAI_API_KEY to run the TTS integration test.")
+class TestTTSGenerationIntegration(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # One client and event loop for the class, so the second format reuses the pooled connection.
+        cls.loop = asyncio.new_event_loop()
+        cls.client = live_openai_client()  # uses env OPENAI_API_KEY
+        cls.service = TTSService(openai_client=cls.client)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.run_until_complete(cls.client.close())
+        cls.loop.close()
+
+    def test_generate_tts_audio_real(self):
+        cases = [
+            ("mp3", "en", "This is a short devotional audio test."),
+            ("wav", "zh", "这是一个中文语音测试。愿你平安。"),
+        ]
+        for fmt, language, text in cases:
+            with self.subTest(fmt=fmt):
+                start = time.perf_counter()
+                audio = self.loop.run_until_complete(
+                    _collect(self.service.generate_audio(text=text, language=language, voice=None, fmt=fmt))
+                )
+                elapsed = time.perf_counter() - start
+                self.assertGreater(len(audio), 128, f"{fmt} stream should have content")
+                if fmt == "wav":
+                    self.assertTrue(audio.startswith(b"RIFF"))
+                print(f"TTS {fmt} generation took {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    unittest.main()
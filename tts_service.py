@@ -1,91 +1,434 @@
-from typing import Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import AsyncOpenAI
+from openai_calls import init_openai_client
+from pathlib import Path
 from tempfile import NamedTemporaryFile
+import asyncio
+import contextlib
+import hashlib
+import json
 import os
+import re
+import struct
+import time
 
+try:
+    import fcntl
+except ImportError:  # not on Windows; warm-up then runs in every worker
+    fcntl = None
 
-def _init_openai_client() -> Optional[OpenAI]:
-    """Initialize OpenAI client if API key is available; otherwise return None.
-    Avoids raising during module import so unit tests can run without network/keys.
-    """
-    try:
-        return OpenAI()
-    except Exception:
-        return None
+
+TTS_MODEL = "gpt-4o-mini-tts"
+
+# OpenAI voices are multi-lingual, so one voice serves both zh and en.
+# 哪种更适合做 Devotional / Prayer？
+# fable：声音柔和、叙事感强，适合讲故事或做灵修分享。
+# alloy：较自然、稳重，男女声中性，适合祷告、沉静的场景。
+# shimmer：稍微明亮、轻快一些，适合鼓励、安慰式的语境。
+DEFAULT_VOICE = "fable"
+
+# Longer inputs are rejected rather than silently truncated.
+MAX_TTS_CHARS = 6000
+
+# opus is about half the size of mp3; pcm is raw 16-bit mono samples with no encoder delay, served behind a
+# streaming WAV header so browsers can play it.
+_MEDIA_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "opus": "audio/ogg",
+    "pcm": "audio/wav",
+}
+
+# Longer inputs are synthesized sentence group by sentence group, so the first audio arrives
+# after the first group instead of after the whole text.
+PIPELINE_MIN_CHARS = 400
+PIPELINE_CHUNK_CHARS = 300
+PIPELINE_CONCURRENCY = 3
+
+# English sentences end in punctuation plus whitespace; CJK ones need no trailing space.
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])\s*")
+
+# OpenAI's raw "pcm" output: 24 kHz, 16-bit, mono.
+_PCM_RATE = 24000
+_PCM_WIDTH = 2
+
+
+def _split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END_RE.split(text) if s.strip()]
+
+
+def _pipeline_chunks(text: str) -> List[str]:
+    """Group sentences into synthesis chunks; the first sentence goes alone to start playback sooner."""
+    if len(text) < PIPELINE_MIN_CHARS:
+        return [text]
+    sentences = _split_sentences(text)
+    chunks = sentences[:1]
+    for sentence in sentences[1:]:
+        if len(chunks) > 1 and len(chunks[-1]) + len(sentence) < PIPELINE_CHUNK_CHARS:
+            chunks[-1] = f"{chunks[-1]} {sentence}"
+        else:
+            chunks.append(sentence)
+    return chunks
+
+
+def _streaming_wav_header() -> bytes:
+    """WAV header for PCM of unknown length, using the 0xFFFFFFFF sizes streaming players accept."""
+    block_align = _PCM_WIDTH
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, _PCM_RATE, _PCM_RATE * block_align, block_align, 8 * _PCM_WIDTH)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+class TextTooLongError(ValueError):
+    """Raised when TTS input exceeds MAX_TTS_CHARS."""
 
 
 class TTSRequest(BaseModel):
     text: str
     language: Optional[str] = "zh"
     voice: Optional[str] = None  # if None, pick by language
-    format: Optional[str] = "mp3"  # mp3 or wav
+    format: Optional[str] = "mp3"  # mp3, wav, opus or pcm
+
+
+_STALE_PART_SECONDS = 3600
+
+
+class _Broadcast:
+    """Chunks of one in-flight synthesis, replayable to any number of listeners."""
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        sent = 0
+        while True:
+            changed = self.changed
+            while sent < len(self.chunks):
+                yield self.chunks[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class TTSCache:
+    """Content-addressed on-disk audio cache, evicting least recently used files past max_bytes."""
+
+    def __init__(self, directory: Path | str, max_bytes: int = 100 * 1024 * 1024) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._inflight: Dict[str, _Broadcast] = {}
+        self.pinned: set[str] = set()  # file names never evicted
+
+    def path_for(self, key: str, fmt: str) -> Path:
+        return self.directory / f"{key}.{fmt}"
+
+    def get(self, key: str, fmt: str) -> Optional[Path]:
+        path = self.path_for(key, fmt)
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except FileNotFoundError:
+            return None
+        return path
+
+    async def write_through(
+        self, key: str, fmt: str, chunks: AsyncIterator[bytes], *, evict: bool = True
+    ) -> AsyncIterator[bytes]:
+        """Yield chunks unchanged while saving them; the file only appears once the stream completes.
+
+        With evict=False the caller is responsible for calling evict() afterwards.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # A large buffer turns the stream's 8 KB chunks into a few big writes.
+        tmp = NamedTemporaryFile(dir=self.directory, suffix=".part", delete=False, buffering=1 << 20)
+        completed = False
+        try:
+            with tmp:
+                async for chunk in chunks:
+                    tmp.write(chunk)
+                    yield chunk
+            os.replace(tmp.name, self.path_for(key, fmt))
+            completed = True
+        finally:
+            if not completed:
+                try:
+                    os.remove(tmp.name)
+                except OSError:
+                    pass
+        if evict:
+            await self.evict()
+
+    async def evict(self) -> None:
+        # Eviction stats every cached file, so it runs off the event loop.
+        await asyncio.to_thread(self._evict)
+
+    def stream(self, key: str, fmt: str, synthesize: Callable[[], AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+        """write_through(synthesize()), shared by every caller asking for the same entry meanwhile.
+
+        The first caller starts the synthesis in a task that runs to completion (filling the cache)
+        even if its listeners go away; later callers replay the chunks so far and then follow live.
+        """
+        name = f"{key}.{fmt}"
+        broadcast = self._inflight.get(name)
+        if broadcast is None:
+            broadcast = self._inflight[name] = _Broadcast()
+            broadcast.task = asyncio.create_task(
+                self._produce(name, broadcast, self.write_through(key, fmt, synthesize(), evict=False))
+            )
+        return broadcast.listen()
+
+    async def _produce(self, name: str, broadcast: _Broadcast, chunks: AsyncIterator[bytes]) -> None:
+        try:
+            async for chunk in chunks:
+                broadcast.chunks.append(chunk)
+                broadcast.notify()
+        except Exception as e:
+            broadcast.error = e
+        except BaseException:
+            # Cancelled (e.g. at shutdown): listeners must not mistake the partial audio for a whole clip.
+            broadcast.error = RuntimeError("TTS synthesis was cancelled")
+            raise
+        finally:
+            del self._inflight[name]
+            broadcast.done = True
+            broadcast.notify()
+        # Only after the listeners have their last chunk, so no response waits on the scan.
+        await self.evict()
+
+    @contextlib.contextmanager
+    def try_lock(self, name: str) -> Iterator[bool]:
+        """Non-blocking lock shared by every process using this directory; yields whether it was acquired."""
+        if fcntl is None:
+            yield True
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / f"{name}.lock", "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _evict(self) -> None:
+        entries = []
+        stale_before = time.time() - _STALE_PART_SECONDS
+        for path in self.directory.iterdir():
+            if path.name in self.pinned or path.suffix == ".lock":
+                continue
+            try:
+                stat = path.stat()
+                # A .part file this old was left by a killed process, not a synthesis in progress.
+                if path.suffix == ".part":
+                    if stat.st_mtime < stale_before:
+                        path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def load_phrases(path: Path | str) -> List[TTSRequest]:
+    """Read a JSON list of TTSRequest objects, e.g. [{"text": "阿们。", "language": "zh"}]."""
+    with open(path, encoding="utf-8") as f:
+        return [TTSRequest(**item) for item in json.load(f)]
 
 
 class TTSService:
     """Service for Text-to-Speech generation via OpenAI."""
 
-    def __init__(self, openai_client: Optional[OpenAI] = None) -> None:
-        self.client: Optional[OpenAI] = openai_client or _init_openai_client()
+    def __init__(self, openai_client: Optional[AsyncOpenAI] = None) -> None:
+        self.client: Optional[AsyncOpenAI] = openai_client or init_openai_client()
 
     def select_voice(self, language: str, override: Optional[str] = None) -> str:
-        """Pick a reasonable default voice by language, unless override provided."""
-        if override:
-            return override
-        # OpenAI voices like 'alloy', 'verse', 'onyx', 'nova' are multi-lingual.
-        # Use 'alloy' as a safe default for both zh/en.
-        # 哪种更适合做 Devotional / Prayer？
-        # 这部分有点主观，但根据社区反馈和我的理解：
-        # fable：声音柔和、叙事感强，适合讲故事或做灵修分享。
-        # alloy：较自然、稳重，男女声中性，适合祷告、沉静的场景。
-        # shimmer：稍微明亮、轻快一些，适合鼓励、安慰式的语境。
-        # 如果你想要一种“温柔、安静、带陪伴感”的声音，我建议先试 fable 或 alloy，效果通常比较贴近祷告与灵修氛围。
-        return "fable" # "alloy"
-
-    def generate_audio(
+        """Return the override, or the default voice used for every language."""
+        return override or DEFAULT_VOICE
+
+    def normalize_text(self, text: str) -> str:
+        if not text or not text.strip():
+            raise ValueError("Missing text for TTS")
+
+        text = text.strip()
+        if len(text) > MAX_TTS_CHARS:
+            raise TextTooLongError(f"Text too long for TTS: {len(text)} > {MAX_TTS_CHARS} characters")
+        return text
+
+    def cache_key(self, text: str, language: str = "zh", voice: Optional[str] = None, fmt: str = "mp3") -> str:
+        """Stable key for the audio generate_audio() would produce for these arguments."""
+        text = self.normalize_text(text)
+        chosen_voice = self.select_voice(language or "zh", voice)
+        fmt, _ = self.resolve_format(fmt)
+        # The model is part of the key so a model change never serves audio from the old one.
+        return hashlib.sha256(f"{TTS_MODEL}|{text}|{chosen_voice}|{language}|{fmt}".encode("utf-8")).hexdigest()
+
+    def resolve_format(self, fmt: Optional[str]) -> Tuple[str, str]:
+        """Normalize the requested format and return (fmt, media_type)."""
+        fmt = fmt.lower() if fmt else "mp3"
+        if fmt not in _MEDIA_TYPES:
+            fmt = "mp3"
+        return fmt, _MEDIA_TYPES[fmt]
+
+    async def generate_audio(
             self,
             text: str,
             language: str = "zh",
             voice: Optional[str] = None,
             fmt: str = "mp3",
             *,
-            openai_client: Optional[OpenAI] = None,
-    ) -> Tuple[str, str]:
+            openai_client: Optional[AsyncOpenAI] = None,
+            chunk_size: int = 8192,
+    ) -> AsyncIterator[bytes]:
         """
-        Generate TTS audio to a temporary file usuber stocking OpenAI TTS.
+        Stream TTS audio bytes from OpenAI as they are synthesized.
 
-        Returns a tuple (temp_file_path, media_type).
-        The caller is responsible for deleting the temp file after streaming/usage.
+        Long texts are split into sentence groups synthesized concurrently and yielded in
+        order. Nothing is buffered to disk; use resolve_format() for the matching media type.
         """
-        if not text or not text.strip():
-            raise ValueError("Missing text for TTS")
-
-        # Basic caps to avoid extremely long synthesis
-        max_chars = 6000
-        text = text.strip()
-        if len(text) > max_chars:
-            text = text[:max_chars]
-
+        text = self.normalize_text(text)
         chosen_voice = self.select_voice(language or "zh", voice)
-        fmt = (fmt or "mp3").lower()
-        if fmt not in {"mp3", "wav"}:
-            fmt = "mp3"
-
-        media_type = "audio/mpeg" if fmt == "mp3" else "audio/wav"
+        fmt, _ = self.resolve_format(fmt)
 
         oc = openai_client or self.client
         if oc is None:
             raise RuntimeError("OpenAI client not configured for TTS")
 
-        with NamedTemporaryFile(delete=False, suffix=f".{fmt}") as tmp:
-            temp_path = tmp.name
+        # Concatenated Ogg streams do not play back as one clip everywhere, so opus is never split.
+        pieces = [text] if fmt == "opus" else _pipeline_chunks(text)
+        if len(pieces) == 1:
+            if fmt == "pcm":
+                yield _streaming_wav_header()
+            async for chunk in self._synthesize(oc, text, chosen_voice, fmt, chunk_size):
+                yield chunk
+            return
+
+        # MP3 frames and PCM samples concatenate cleanly; WAV is rebuilt as one header followed by raw PCM.
+        piece_fmt = "pcm" if fmt in ("wav", "pcm") else fmt
+        semaphore = asyncio.Semaphore(PIPELINE_CONCURRENCY)
 
-        # Stream audio to file via SDK
-        with oc.audio.speech.with_streaming_response.create(
-                model="gpt-4o-mini-tts",
-                voice=chosen_voice,
+        async def synthesize_whole(piece: str) -> bytes:
+            async with semaphore:
+                return b"".join([c async for c in self._synthesize(oc, piece, chosen_voice, piece_fmt, chunk_size)])
+
+        # The first piece streams straight through while the rest are synthesized ahead of time.
+        pending = [asyncio.ensure_future(synthesize_whole(piece)) for piece in pieces[1:]]
+        try:
+            if piece_fmt == "pcm":
+                yield _streaming_wav_header()
+            async for chunk in self._synthesize(oc, pieces[0], chosen_voice, piece_fmt, chunk_size):
+                yield chunk
+            for task in pending:
+                yield await task
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate_audio_bytes(
+            self,
+            text: str,
+            language: str = "zh",
+            voice: Optional[str] = None,
+            fmt: str = "mp3",
+    ) -> Tuple[bytes, str]:
+        """Whole-clip variant of generate_audio(), returning (audio, media_type) from memory."""
+        _, media_type = self.resolve_format(fmt)
+        audio = b"".join([chunk async for chunk in self.generate_audio(text, language, voice, fmt)])
+        return audio, media_type
+
+    def pin_phrases(self, cache: TTSCache, phrases: Iterable[TTSRequest]) -> None:
+        """Exempt the phrases' cache entries from eviction; invalid phrases are ignored."""
+        for req in phrases:
+            try:
+                key, fmt = self.cache_entry(req)
+            except ValueError:
+                continue
+            cache.pinned.add(cache.path_for(key, fmt).name)
+
+    async def warm_cache(
+        self, cache: TTSCache, phrases: Iterable[TTSRequest], concurrency: int = 4
+    ) -> List[Union[Path, BaseException]]:
+        """Pin frequently requested phrases and synthesize the ones not cached yet.
+
+        Returns one result per phrase that needed synthesis.
+        """
+        phrases = list(phrases)
+        # Pinned first, so warming more phrases than fit never evicts the earlier ones.
+        self.pin_phrases(cache, phrases)
+        missing = [req for req in phrases if not self._is_cached(cache, req)]
+        return await self.generate_many(cache, missing, concurrency)
+
+    def _is_cached(self, cache: TTSCache, req: TTSRequest) -> bool:
+        try:
+            key, fmt = self.cache_entry(req)
+        except ValueError:
+            return False  # left for generate_many to report
+        return cache.get(key, fmt) is not None
+
+    async def _synthesize(
+            self, oc: AsyncOpenAI, text: str, voice: str, fmt: str, chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        async with oc.audio.speech.with_streaming_response.create(
+                model=TTS_MODEL,
+                voice=voice,
                 input=text,
+                response_format=fmt,
         ) as response:
-            response.stream_to_file(temp_path)
+            async for chunk in response.iter_bytes(chunk_size):
+                yield chunk
+
+    def cache_entry(self, req: TTSRequest) -> Tuple[str, str]:
+        """(key, fmt) under which req's audio is cached."""
+        fmt, _ = self.resolve_format(req.format)
+        return self.cache_key(req.text, req.language or "zh", req.voice, fmt), fmt
+
+    async def synthesize_to_cache(self, cache: TTSCache, req: TTSRequest) -> Path:
+        """Return the cached audio file for req, synthesizing it first on a miss."""
+        language = req.language or "zh"
+        key, fmt = self.cache_entry(req)
+        cached_path = cache.get(key, fmt)
+        if cached_path is not None:
+            return cached_path
+        audio = cache.stream(key, fmt, lambda: self.generate_audio(req.text, language, req.voice, fmt))
+        async for _ in audio:
+            pass
+        return cache.path_for(key, fmt)
+
+    async def generate_many(
+        self, cache: TTSCache, requests: Iterable[TTSRequest], concurrency: int = 4
+    ) -> List[Union[Path, BaseException]]:
+        """Synthesize a batch into the cache with at most `concurrency` TTS calls in flight.
+
+        Results are in request order; a failed item is returned as its exception.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(req: TTSRequest) -> Path:
+            async with semaphore:
+                return await self.synthesize_to_cache(cache, req)
 
-        return temp_path, media_type
+        return await asyncio.gather(*(one(req) for req in requests), return_exceptions=True)